@@ -0,0 +1,94 @@
+# ========== bench/startup.py ==========
+"""
+Startup-time benchmark and regression budget.
+Each module is imported in a fresh interpreter with `-X importtime`; the
+cumulative import time (best of several runs) is compared with
+bench/startup_budget.json, and none of the heavy backend libraries listed
+there may be loaded by the import. Prints a JSON report; exits with 1 when a
+budget is exceeded.
+
+    python bench/startup.py [--runs 5] [--top 10] [module ...]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(ROOT, "bench", "startup_budget.json")
+
+_PROBE = "import sys, json; import {}; print(json.dumps(sorted(sys.modules)))"
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from `python -X importtime` output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(module):
+    """Import `module` once in a fresh interpreter; returns (cumulative ms, importtime table, loaded modules)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    times = parse_importtime(proc.stderr)
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return times.get(module, (0, 0))[1] / 1000.0, times, loaded
+
+
+def bench_module(module, runs, forbidden, top):
+    best, best_times, loaded = None, {}, []
+    for _ in range(runs):
+        ms, times, loaded = measure(module)
+        if best is None or ms < best:
+            best, best_times = ms, times
+    heaviest = sorted(best_times.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    return {
+        "ms": round(best, 1),
+        "heavy_imports": sorted(m for m in forbidden if m in loaded),
+        "slowest_self_ms": {name: round(self_us / 1000.0, 1) for name, (self_us, _) in heaviest},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time of the app's entry modules.")
+    parser.add_argument("modules", nargs="*", help="modules to measure (default: every module in the budget)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module; the best run counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest imported modules to list per entry")
+    parser.add_argument("--budget", default=BUDGET_PATH)
+    args = parser.parse_args(argv)
+
+    with open(args.budget, encoding="utf-8") as f:
+        budget = json.load(f)
+    limits = budget["budget_ms"]
+    forbidden = budget.get("forbidden", [])
+
+    report, failed = {}, False
+    for module in args.modules or list(limits):
+        try:
+            result = bench_module(module, args.runs, forbidden, args.top)
+        except RuntimeError as e:
+            report[module] = {"skipped": str(e)}
+            continue
+        limit = limits.get(module)
+        result["budget_ms"] = limit
+        result["ok"] = (limit is None or result["ms"] <= limit) and not result["heavy_imports"]
+        failed |= not result["ok"]
+        report[module] = result
+
+    print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
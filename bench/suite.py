@@ -0,0 +1,404 @@
+# ========== bench/suite.py ==========
+"""
+Offline benchmark suite for the pipeline stages.
+Synthetic speech-like WAV fixtures of several lengths are generated once; a
+deterministic stub translator and stub TTS stand in for the network backends,
+so runs are repeatable and need no API keys. Every stage is measured on its own
+and the whole pipeline end to end; each result records wall time, throughput
+(audio seconds per wall second) and peak RSS. Results are written as JSON and
+can be compared with an earlier run to catch regressions.
+
+    python bench/suite.py [--lengths 30,120,600] [--out results.json] [--compare baseline.json]
+
+Transcription uses Whisper "tiny" when it is installed; otherwise that stage is
+skipped and the end-to-end run uses a stub transcriber. Sentence grouping is
+measured with the punctuation splitter and, when spaCy is installed, with the
+spaCy segmenter, each on the transcript with and without punctuation. Stages
+that need ffmpeg (and ffprobe, for the end-to-end run) are skipped when it is
+not on PATH.
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from core.translators import Translator  # noqa: E402
+
+RESULTS_SCHEMA = 1
+FIXTURE_RATE = 22050
+WORDS_PER_SECOND = 2.5
+DEFAULT_LENGTHS = (30, 120, 600)
+REGRESSION_RATIO = 1.2
+_VOCAB = ("the", "a", "language", "learner", "reads", "every", "morning", "and", "writes", "short",
+          "notes", "about", "new", "words", "in", "her", "book", "42", "teacher", "explains", "grammar")
+
+
+# ---------- measurement ----------
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+class PeakRSS:
+    """Samples the resident set size in a background thread while a stage runs."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+class Recorder:
+    def __init__(self):
+        self.results = {}
+
+    @contextmanager
+    def stage(self, fixture, name, audio_seconds, **extra):
+        entry = {"audio_seconds": audio_seconds, **extra}
+        self.results.setdefault(fixture, {})[name] = entry
+        with PeakRSS() as rss:
+            t0 = time.perf_counter()
+            yield entry
+            seconds = time.perf_counter() - t0
+        entry["seconds"] = round(seconds, 4)
+        entry["throughput"] = round(audio_seconds / seconds, 2) if seconds else None
+        entry["peak_rss_mb"] = round(rss.peak / 2 ** 20, 1)
+
+    def skip(self, fixture, name, reason):
+        self.results.setdefault(fixture, {})[name] = {"skipped": reason}
+
+
+# ---------- fixtures and stubs ----------
+
+def make_fixture(path, seconds, rate=FIXTURE_RATE):
+    """Mono 16-bit WAV of tone bursts ('words') separated by short pauses, deterministic for a length."""
+    rng = np.random.default_rng(seconds)
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    envelope = (np.sin(2 * np.pi * WORDS_PER_SECOND / 2 * t) > -0.3).astype(np.float32)
+    pitch = 140 + 60 * np.sin(2 * np.pi * 0.11 * t)
+    signal = np.sin(2 * np.pi * np.cumsum(pitch) / rate) * envelope
+    signal += 0.02 * rng.standard_normal(n)
+    samples = np.clip(signal * 12000, -32768, 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    return path
+
+
+def synthetic_segments(seconds):
+    """Whisper-shaped segments with word timestamps covering `seconds` of audio."""
+    n_words = int(seconds * WORDS_PER_SECOND)
+    step = seconds / max(n_words, 1)
+    segments, words = [], []
+    for i in range(n_words):
+        word = _VOCAB[(i * 7 + i // 5) % len(_VOCAB)]
+        if i % 11 == 10:
+            word += "."
+        elif i % 29 == 28:
+            word += "?"
+        words.append({"word": " " + word, "start": round(i * step, 3), "end": round(i * step + step * 0.8, 3)})
+        if len(words) == 20 or i == n_words - 1:
+            segments.append({"start": words[0]["start"], "end": words[-1]["end"],
+                             "text": "".join(w["word"] for w in words), "words": words})
+            words = []
+    return segments
+
+
+def unpunctuated(segments):
+    """`segments` with sentence-final punctuation stripped from every word."""
+    return [dict(seg, words=[dict(w, word=w["word"].rstrip(".?!")) for w in seg["words"]]) for seg in segments]
+
+
+class StubTranslator(Translator):
+    """Deterministic offline translator: transliterates Latin letters to Cyrillic."""
+    provider = "bench"
+    model = "stub"
+    _TABLE = str.maketrans("abcdefghijklmnopqrstuvwxyz", "абцдефгхийклмнопкрстуввхыз")
+
+    def translate_batch(self, texts):
+        return [t.lower().translate(self._TABLE) for t in texts]
+
+
+def stub_clip(text, rate=24000):
+    """Deterministic tone clip whose length follows the text, like speech."""
+    n = int(rate * (0.3 + 0.06 * len(text)))
+    t = np.arange(n) / rate
+    return (np.sin(2 * np.pi * (180 + len(text) % 50) * t) * 8000).astype("<i2"), rate
+
+
+class StubTTSEngine:
+    """Same interface as core.tts.TTSEngine; writes WAV data so no network or encoder is needed."""
+
+    def submit(self, text, voice, path):
+        from concurrent.futures import Future
+        fut = Future()
+        samples, rate = stub_clip(text)
+        with wave.open(path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(samples.tobytes())
+        fut.set_result(True)
+        return fut
+
+    def synthesize(self, text, voice, path):
+        return self.submit(text, voice, path).result()
+
+    def synthesize_batch(self, items, progress=None):
+        results = []
+        for i, (text, voice, path) in enumerate(items, start=1):
+            results.append(self.synthesize(text, voice, path))
+            if progress:
+                progress(i, len(items))
+        return results
+
+    def close(self):
+        pass
+
+
+def _whisper_available():
+    try:
+        import whisper  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# ---------- stages ----------
+
+def bench_fixture(rec, name, path, seconds, workdir):
+    from core.hashing import hash_file
+    from core.units import group_by_sentence
+    from core.segmentation import segment_spacy, spacy_available
+    from core.transcribe import build_semantic_units, transcribe_segments
+    from core.translators import translate_sentences
+    from core.audio_store import AudioStore
+    from core.timeline import build_timeline
+    from core.render import render_outputs
+
+    with rec.stage(name, "hash", seconds, bytes=os.path.getsize(path)):
+        hash_file(path)
+
+    if not shutil.which("ffmpeg"):
+        rec.skip(name, "transcribe", "ffmpeg not on PATH")
+    elif not _whisper_available():
+        rec.skip(name, "transcribe", "whisper not installed")
+    else:
+        with rec.stage(name, "transcribe", seconds, model="tiny") as entry:
+            entry["segments"] = sum(1 for _ in transcribe_segments(path, workdir, "tiny"))
+
+    segments = synthetic_segments(seconds)
+    with rec.stage(name, "group", seconds) as entry:
+        units = build_semantic_units(segments)
+        sentences = group_by_sentence(units)
+        entry.update(units=len(units), sentences=len(sentences),
+                     max_sentence_units=max(len(s["units"]) for s in sentences))
+
+    # The same transcript without punctuation, as ASR sometimes returns it.
+    bare_units = build_semantic_units(unpunctuated(segments))
+    with rec.stage(name, "group_unpunctuated", seconds) as entry:
+        bare = group_by_sentence(bare_units)
+        entry.update(sentences=len(bare), max_sentence_units=max(len(s["units"]) for s in bare))
+
+    if not spacy_available():
+        rec.skip(name, "segment_spacy", "spaCy not installed")
+        rec.skip(name, "segment_spacy_unpunctuated", "spaCy not installed")
+    else:
+        from core.models import registry
+        nlp = registry.spacy_senter()
+        for stage, stage_units in (("segment_spacy", units), ("segment_spacy_unpunctuated", bare_units)):
+            with rec.stage(name, stage, seconds) as entry:
+                found = segment_spacy(stage_units, nlp)
+                entry.update(sentences=len(found), max_sentence_units=max(len(s["units"]) for s in found))
+
+    with rec.stage(name, "translate", seconds, sentences=len(sentences)):
+        translations = translate_sentences(StubTranslator(), [(s["id"], s["text_eng"]) for s in sentences])
+        for s in sentences:
+            s["text_ru"] = translations[s["id"]]
+
+    store = AudioStore(os.path.join(workdir, "tts"))
+    engine = StubTTSEngine()
+    with rec.stage(name, "tts", seconds, clips=len(sentences)):
+        staged = [(s, *store.staging_path("bench", s["text_ru"])) for s in sentences]
+        flags = engine.synthesize_batch([(s["text_ru"], "bench", tmp) for s, tmp, _ in staged])
+        for (s, tmp, final), ok in zip(staged, flags):
+            s["audio_ru_path"] = store.commit(tmp, final, ok)
+
+    with wave.open(path) as w:
+        rate = w.getframerate()
+        source = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, 1)
+    clips = {}
+
+    def load_clip(clip_path):
+        if clip_path not in clips:
+            with wave.open(clip_path) as w:
+                samples = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, 1)
+                clip_rate = w.getframerate()
+            clips[clip_path] = (samples, round(1000 * len(samples) / clip_rate), clip_rate)
+        return clips[clip_path]
+
+    with rec.stage(name, "assemble", seconds, subtitle_mode="1") as entry:
+        timeline, events = build_timeline(sentences, source, rate, 1, "1", load_clip)
+        samples = timeline.render()
+        entry.update(events=len(events), output_seconds=round(len(samples) / timeline.frame_rate, 1))
+
+    if not shutil.which("ffmpeg"):
+        rec.skip(name, "export", "ffmpeg not on PATH")
+    else:
+        ass_path = os.path.join(workdir, "subs.ass")
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write("[Script Info]\nScriptType: v4.00+\n")
+        with rec.stage(name, "export", seconds):
+            render_outputs(samples, timeline.frame_rate, os.path.join(workdir, "out.mp3"),
+                           os.path.join(workdir, "out.mp4"), ass_path)
+
+
+def bench_end_to_end(rec, name, path, seconds, workdir):
+    """run_pipeline_main with the stub translator and TTS, on a fresh cache."""
+    missing = [tool for tool in ("ffmpeg", "ffprobe") if not shutil.which(tool)]
+    if missing:
+        # pydub probes every file it decodes with ffprobe.
+        rec.skip(name, "end_to_end", f"{' and '.join(missing)} not on PATH")
+        return
+    from core import ttw, transcribe
+
+    use_whisper = _whisper_available()
+    real_transcribe = transcribe.transcribe_segments
+
+    def bench_transcribe(audio_path, tmpdir, model_name="medium", **kwargs):
+        if use_whisper:
+            return real_transcribe(audio_path, tmpdir, "tiny", **kwargs)
+        return iter(synthetic_segments(seconds))
+
+    patched = [(ttw, "get_translator", lambda code: StubTranslator()),
+               (ttw, "get_engine", StubTTSEngine),
+               (transcribe, "transcribe_segments", bench_transcribe)]
+    saved = [(mod, attr, getattr(mod, attr)) for mod, attr, _ in patched]
+    for mod, attr, value in patched:
+        setattr(mod, attr, value)
+    try:
+        tmpdir = os.path.join(workdir, "run")
+        os.makedirs(tmpdir)
+        out_dir = os.path.join(workdir, "out")
+        os.makedirs(out_dir)
+        db_config = {"database": os.path.join(workdir, "cache.db"), "media_dir": os.path.join(workdir, "media")}
+        with rec.stage(name, "end_to_end", seconds,
+                       transcriber="whisper-tiny" if use_whisper else "stub") as entry:
+            report = ttw.run_pipeline_main(path, "h", "male", "1", tmpdir, db_config, out_dir)
+            entry["stages"] = report["stages"]
+    finally:
+        for mod, attr, value in saved:
+            setattr(mod, attr, value)
+
+
+# ---------- results ----------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, ratio=REGRESSION_RATIO):
+    """Stages that got slower than `ratio` times the baseline: [(fixture, stage, old s, new s)]."""
+    regressions = []
+    for fixture, stages in current["results"].items():
+        for stage, entry in stages.items():
+            old = baseline.get("results", {}).get(fixture, {}).get(stage, {})
+            if "seconds" in entry and old.get("seconds") and entry["seconds"] > old["seconds"] * ratio:
+                regressions.append((fixture, stage, old["seconds"], entry["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic audio.")
+    parser.add_argument("--lengths", default=",".join(map(str, DEFAULT_LENGTHS)),
+                        help="fixture lengths in seconds, comma-separated")
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "ela-bench-fixtures"))
+    parser.add_argument("--no-end-to-end", dest="end_to_end", action="store_false")
+    parser.add_argument("--out", help="write the JSON results here (default: stdout only)")
+    parser.add_argument("--compare", help="earlier results file; exits with 1 on regressions")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO,
+                        help="slowdown factor that counts as a regression")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.fixtures_dir, exist_ok=True)
+    rec = Recorder()
+    for seconds in (int(x) for x in args.lengths.split(",") if x.strip()):
+        name = f"{seconds}s"
+        path = os.path.join(args.fixtures_dir, f"speech_{seconds}s.wav")
+        if not os.path.exists(path):
+            make_fixture(path, seconds)
+        with tempfile.TemporaryDirectory(prefix="ela-bench-") as workdir:
+            print(f"Benchmarking {name}...", file=sys.stderr)
+            bench_fixture(rec, name, path, seconds, workdir)
+        if args.end_to_end:
+            with tempfile.TemporaryDirectory(prefix="ela-bench-") as workdir:
+                bench_end_to_end(rec, name, path, seconds, workdir)
+
+    result = {
+        "schema": RESULTS_SCHEMA,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": rec.results,
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.ratio)
+        for fixture, stage, old, new in regressions:
+            print(f"REGRESSION {fixture} {stage}: {old:.3f}s -> {new:.3f}s", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
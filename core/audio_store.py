@@ -0,0 +1,76 @@
+# ========== core/audio_store.py ==========
+"""
+Content-addressed on-disk store for synthesized TTS clips.
+Clips are keyed by (voice, text, TTS settings), written atomically and evicted
+least-recently-used first once the store grows past its byte quota.
+"""
+
+import os
+import json
+import hashlib
+import itertools
+
+from core.disk_lru import DiskLRU
+
+DEFAULT_QUOTA_MB = int(os.getenv("ELA_TTS_CACHE_MB", "2048"))
+
+# edge-tts defaults; part of the key so a change in prosody never reuses old clips.
+TTS_SETTINGS = {"rate": "+0%", "volume": "+0%", "pitch": "+0Hz", "format": "mp3"}
+
+
+class AudioStore(DiskLRU):
+    extension = ".mp3"
+
+    def __init__(self, root, quota_mb=DEFAULT_QUOTA_MB):
+        super().__init__(root, quota_mb)
+        self._seq = itertools.count()
+
+    @staticmethod
+    def key(voice, text, settings=None):
+        payload = json.dumps([voice or "", text, settings or TTS_SETTINGS], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.mp3")
+
+    def get(self, voice, text, settings=None):
+        """Path of the stored clip, or None on a miss."""
+        path = self.path_for(self.key(voice, text, settings))
+        hit = os.path.exists(path)
+        if hit:
+            self.touch(path)
+        self._count(hit)
+        return path if hit else None
+
+    def staging_path(self, voice, text, settings=None):
+        """(tmp_path, final_path) for writing a clip outside the store; see commit()."""
+        path = self.path_for(self.key(voice, text, settings))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{os.getpid()}.{next(self._seq)}.tmp", path
+
+    def commit(self, tmp, path, ok=True):
+        """Atomically move a staged clip into place; returns the stored path or None."""
+        try:
+            if ok:
+                os.replace(tmp, path)
+                return path
+            return None
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def put_with(self, voice, text, writer, settings=None):
+        """Create a clip with `writer(tmp_path) -> bool` and move it into place atomically.
+
+        Returns the stored path, or None if the writer failed.
+        """
+        tmp, path = self.staging_path(voice, text, settings)
+        ok = False
+        try:
+            ok = writer(tmp)
+        finally:
+            path = self.commit(tmp, path, ok)
+        return path
+
+    def fetch_or_create(self, voice, text, writer, settings=None):
+        return self.get(voice, text, settings) or self.put_with(voice, text, writer, settings)
@@ -0,0 +1,195 @@
+# ========== core/cache_admin.py ==========
+"""
+Size accounting, eviction and maintenance for cache.db.
+Every cached row records its payload size and last access time. prune() drops
+rows past the TTL and then least-recently-used rows until each table fits its
+byte quota; deleting a file_cache row takes its translations and key terms with
+it through ON DELETE CASCADE, and transcripts of interrupted jobs are kept.
+Freed pages are returned to the filesystem by incremental vacuum in a
+background thread.
+
+    python -m core.cache_admin stats
+    python -m core.cache_admin prune [--ttl-days 30] [--quota translation_cache=256]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+from core.cache_engine import TRACKED_TABLES
+
+# Parents first, so quota checks on child tables see what the cascade already removed.
+EVICTION_ORDER = ("file_cache", "translation_cache", "key_terms_cache")
+DEFAULT_QUOTAS_MB = {"file_cache": 1024, "translation_cache": 1024, "key_terms_cache": 64}
+TTL_DAYS = float(os.getenv("ELA_CACHE_TTL_DAYS", "90"))
+VACUUM_STEP_PAGES = 2048
+
+_vacuum_lock = threading.Lock()
+
+
+def parse_quotas(spec):
+    """'table=MB,table=MB' -> {table: MB}."""
+    quotas = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        table, _, mb = part.partition("=")
+        if table not in TRACKED_TABLES:
+            raise ValueError(f"Unknown cache table {table!r}")
+        quotas[table] = float(mb)
+    return quotas
+
+
+def default_quotas():
+    quotas = dict(DEFAULT_QUOTAS_MB)
+    quotas.update(parse_quotas(os.getenv("ELA_CACHE_QUOTAS_MB")))
+    return quotas
+
+
+def record_lookup(cursor, table, key, hit):
+    """Count a cache lookup and refresh the row's access time on a hit.
+
+    This writes to cache.db: commit right after it, or the write lock is held
+    through whatever stage follows the lookup.
+    """
+    if hit:
+        cursor.execute(f"UPDATE {table} SET last_access = ? WHERE {TRACKED_TABLES[table][0]} = ?",
+                       (time.time(), key))
+    cursor.execute(
+        "INSERT INTO cache_stats (table_name, hits, misses) VALUES (?, ?, ?) "
+        "ON CONFLICT(table_name) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+        (table, int(hit), int(not hit))
+    )
+
+
+def _protected_keys(conn, table):
+    # Interrupted jobs resume from their cached transcript.
+    if table == "file_cache":
+        return {row[0] for row in conn.execute("SELECT DISTINCT data_hash FROM pipeline_jobs")}
+    if table == "translation_cache":
+        return {row[0] for row in conn.execute("SELECT full_hash FROM pipeline_jobs")}
+    return set()
+
+
+def _delete(conn, table, keys):
+    key_col = TRACKED_TABLES[table][0]
+    keys = list(keys)
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        conn.execute(f"DELETE FROM {table} WHERE {key_col} IN ({','.join('?' * len(chunk))})", chunk)
+
+
+def prune(conn, quotas=None, ttl_days=TTL_DAYS, now=None):
+    """Evict expired rows, then LRU rows over quota; returns {table: {"rows": n, "bytes": b}}."""
+    quotas = default_quotas() if quotas is None else quotas
+    now = time.time() if now is None else now
+    evicted = {}
+    for table in EVICTION_ORDER:
+        key_col = TRACKED_TABLES[table][0]
+        protected = _protected_keys(conn, table)
+        rows = [r for r in conn.execute(f"SELECT {key_col}, bytes, last_access FROM {table} ORDER BY last_access")
+                if r[0] not in protected]
+        victims, freed = [], 0
+        if ttl_days:
+            cutoff = now - ttl_days * 86400
+            expired = [r for r in rows if r[2] < cutoff]
+            victims += [r[0] for r in expired]
+            freed += sum(r[1] for r in expired)
+            rows = rows[len(expired):]
+        quota = quotas.get(table)
+        if quota is not None:
+            over = conn.execute(f"SELECT COALESCE(SUM(bytes), 0) FROM {table}").fetchone()[0] - freed
+            over -= int(quota * 1024 * 1024)
+            for key, size, _ in rows:
+                if over <= 0:
+                    break
+                victims.append(key)
+                freed += size
+                over -= size
+        _delete(conn, table, victims)
+        evicted[table] = {"rows": len(victims), "bytes": freed}
+    conn.commit()
+    return evicted
+
+
+def incremental_vacuum(conn, step=VACUUM_STEP_PAGES):
+    """Release free pages in small steps so other writers are not blocked for long; returns pages freed."""
+    freed = 0
+    while True:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            return freed
+        conn.execute(f"PRAGMA incremental_vacuum({min(free, step)})").fetchall()
+        conn.commit()
+        freed += min(free, step)
+
+
+def vacuum_in_background(pool):
+    """Run incremental_vacuum on a pooled connection in a daemon thread; one at a time per process."""
+    def run():
+        if not _vacuum_lock.acquire(blocking=False):
+            return
+        try:
+            with pool.connection() as conn:
+                incremental_vacuum(conn)
+        finally:
+            _vacuum_lock.release()
+
+    thread = threading.Thread(target=run, name="cache-vacuum", daemon=True)
+    thread.start()
+    return thread
+
+
+def stats(conn, quotas=None):
+    quotas = default_quotas() if quotas is None else quotas
+    counters = {name: (hits, misses) for name, hits, misses in
+                conn.execute("SELECT table_name, hits, misses FROM cache_stats")}
+    tables = {}
+    for table in EVICTION_ORDER:
+        entries, size, oldest = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(bytes), 0), MIN(last_access) FROM {table}").fetchone()
+        hits, misses = counters.get(table, (0, 0))
+        tables[table] = {
+            "entries": entries,
+            "bytes": size,
+            "quota_bytes": int(quotas[table] * 1024 * 1024) if table in quotas else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "oldest_access": oldest,
+        }
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return {
+        "tables": tables,
+        "file_bytes": conn.execute("PRAGMA page_count").fetchone()[0] * page_size,
+        "free_bytes": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+    }
+
+
+def main(argv=None):
+    from core.db_utils import CACHE_DB, cache_pool
+
+    parser = argparse.ArgumentParser(prog="python -m core.cache_admin", description="Inspect and prune cache.db.")
+    parser.add_argument("command", choices=("stats", "prune"))
+    parser.add_argument("--db", default=CACHE_DB)
+    parser.add_argument("--ttl-days", type=float, default=TTL_DAYS, help="0 disables expiry")
+    parser.add_argument("--quota", action="append", default=[], metavar="TABLE=MB",
+                        help="override a table's quota (repeatable)")
+    args = parser.parse_args(argv)
+
+    quotas = default_quotas()
+    quotas.update(parse_quotas(",".join(args.quota)))
+    pool = cache_pool(args.db)
+    with pool.connection() as conn:
+        result = {}
+        if args.command == "prune":
+            result["evicted"] = prune(conn, quotas, args.ttl_days)
+            result["vacuumed_pages"] = incremental_vacuum(conn)
+        result.update(stats(conn, quotas))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
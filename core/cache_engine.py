@@ -0,0 +1,200 @@
+# ========== core/cache_engine.py ==========
+"""
+SQLite engine shared by the cache and settings databases.
+Connections are opened once with WAL journaling and tuned pragmas and kept in a
+thread-safe pool per database file, so the UI, pipeline and worker threads reuse
+them instead of reconnecting for every query. Large JSON values are stored as
+compressed blobs with a versioned header; older plain-JSON rows stay readable
+and are converted by the schema migrations, which run once per process.
+"""
+
+import os
+import json
+import zlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    # Takes effect for new files; existing cache.db files are switched by migration 2.
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA busy_timeout = 30000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+)
+POOL_SIZE = 4
+
+# Blob header: magic + one encoding version byte.
+BLOB_MAGIC = b"ELA"
+ENC_ZLIB_JSON = 1
+COMPRESS_LEVEL = 1
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Idle connections to one database file, handed out to one thread at a time."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return connect(self.path)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; the caller commits, anything uncommitted is rolled back."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def get_pool(path, setup=None):
+    """Process-wide pool for `path`; `setup(conn)` runs once when the pool is created."""
+    key = os.path.abspath(path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key)
+            if setup is not None:
+                with pool.connection() as conn:
+                    setup(conn)
+                    conn.commit()
+            _pools[key] = pool
+    return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def json_default(obj):
+    """`default=` hook for json.dump: objects with a to_json() method are written in that form."""
+    to_json = getattr(obj, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_json()
+
+
+def encode_blob(obj):
+    return encode_payload(json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8"))
+
+
+def encode_payload(payload):
+    """encode_blob for an object that is already serialized to UTF-8 JSON bytes."""
+    return BLOB_MAGIC + bytes([ENC_ZLIB_JSON]) + zlib.compress(payload, COMPRESS_LEVEL)
+
+
+def decode_blob(value):
+    """Inverse of encode_blob; plain JSON text from older cache files is accepted too."""
+    if isinstance(value, str):
+        return json.loads(value)
+    value = bytes(value)
+    if not value.startswith(BLOB_MAGIC):
+        return json.loads(value.decode("utf-8"))
+    version = value[len(BLOB_MAGIC)]
+    if version == ENC_ZLIB_JSON:
+        return json.loads(zlib.decompress(value[len(BLOB_MAGIC) + 1:]).decode("utf-8"))
+    raise ValueError(f"Unknown cache blob encoding {version}")
+
+
+# Rows re-encoded per transaction by migrations, so a large cache.db is never read into memory whole.
+MIGRATION_BATCH_ROWS = 64
+
+
+def _compress_json_columns(conn):
+    # Converted rows stop matching typeof = 'text', so every batch picks up where the last one ended,
+    # and an interrupted migration resumes from its last commit.
+    for table, key, column in (("file_cache", "data_hash", "semantic_units"),
+                               ("translation_cache", "full_hash", "bilingual_objects")):
+        while True:
+            rows = conn.execute(f"SELECT {key}, {column} FROM {table} WHERE typeof({column}) = 'text' LIMIT ?",
+                                (MIGRATION_BATCH_ROWS,)).fetchall()
+            if not rows:
+                break
+            conn.executemany(
+                f"UPDATE {table} SET {column} = ? WHERE {key} = ?",
+                [(encode_blob(json.loads(text)), k) for k, text in rows]
+            )
+            conn.commit()
+
+
+# Tables with size and access tracking: key column, payload column.
+TRACKED_TABLES = {
+    "file_cache": ("data_hash", "semantic_units"),
+    "translation_cache": ("full_hash", "bilingual_objects"),
+    "key_terms_cache": ("data_hash", "terms_json"),
+}
+
+
+def _add_access_tracking(conn):
+    for table, (_, column) in TRACKED_TABLES.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if "bytes" not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN bytes INTEGER NOT NULL DEFAULT 0")
+        if "last_access" not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        conn.execute(f"UPDATE {table} SET bytes = length({column}), "
+                     f"last_access = CAST(strftime('%s', 'now') AS REAL) WHERE last_access = 0")
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # auto_vacuum only changes on a full rebuild; done once so later vacuums can be incremental.
+        conn.commit()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+# user_version -> migration bringing the database to that version.
+MIGRATIONS = {
+    1: _compress_json_columns,
+    2: _add_access_tracking,
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+def migrate(conn, schema):
+    """Create missing tables from `schema`, then apply pending migrations."""
+    conn.executescript(schema)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        MIGRATIONS[target](conn)
+        conn.execute(f"PRAGMA user_version = {target}")
+        conn.commit()
@@ -0,0 +1,72 @@
+# ========== core/checkpoints.py ==========
+"""
+Stage and per-sentence checkpoints stored in cache.db.
+A job row records the run's arguments and the stage it reached; every finished
+sentence is saved as it completes, so an interrupted run resumes from the last
+completed sentence instead of translating and synthesizing everything again.
+"""
+
+import json
+
+from core.cache_engine import json_default
+
+STAGES = ("hash", "transcribe", "translate", "render")
+
+
+def start_job(cursor, full_hash, data_hash, audio_path, output_dir, translator_choice, voice_choice, subtitle_mode):
+    cursor.execute(
+        "INSERT INTO pipeline_jobs (full_hash, data_hash, audio_path, output_dir, translator_choice, "
+        "voice_choice, subtitle_mode, stage) VALUES (?, ?, ?, ?, ?, ?, ?, 'hash') "
+        "ON CONFLICT(full_hash) DO UPDATE SET audio_path = excluded.audio_path, "
+        "output_dir = excluded.output_dir, subtitle_mode = excluded.subtitle_mode, "
+        "updated_at = CURRENT_TIMESTAMP",
+        (full_hash, data_hash, audio_path, output_dir, translator_choice, voice_choice or "", subtitle_mode)
+    )
+
+
+def set_stage(cursor, full_hash, stage):
+    cursor.execute(
+        "UPDATE pipeline_jobs SET stage = ?, updated_at = CURRENT_TIMESTAMP WHERE full_hash = ?",
+        (stage, full_hash)
+    )
+
+
+def finish_job(cursor, full_hash):
+    # sentence_checkpoints rows go with it through ON DELETE CASCADE.
+    cursor.execute("DELETE FROM pipeline_jobs WHERE full_hash = ?", (full_hash,))
+
+
+def save_sentence(cursor, full_hash, sentence):
+    cursor.execute(
+        "REPLACE INTO sentence_checkpoints (full_hash, sentence_id, sentence) VALUES (?, ?, ?)",
+        (full_hash, sentence["id"], json.dumps(sentence, ensure_ascii=False, default=json_default))
+    )
+
+
+def load_sentences(cursor, full_hash):
+    """{sentence id: sentence} of every sentence completed by an earlier run."""
+    cursor.execute("SELECT sentence_id, sentence FROM sentence_checkpoints WHERE full_hash = ?", (full_hash,))
+    return {sid: json.loads(payload) for sid, payload in cursor.fetchall()}
+
+
+def get_job(cursor, full_hash):
+    jobs = list_jobs(cursor, full_hash)
+    return jobs[0] if jobs else None
+
+
+def list_jobs(cursor, full_hash=None):
+    """Interrupted jobs with their arguments, stage and number of completed sentences."""
+    query = (
+        "SELECT j.full_hash, j.data_hash, j.audio_path, j.output_dir, j.translator_choice, j.voice_choice, "
+        "j.subtitle_mode, j.stage, j.updated_at, COUNT(c.sentence_id) "
+        "FROM pipeline_jobs j LEFT JOIN sentence_checkpoints c ON c.full_hash = j.full_hash "
+    )
+    params = ()
+    if full_hash is not None:
+        query += "WHERE j.full_hash = ? "
+        params = (full_hash,)
+    query += "GROUP BY j.full_hash ORDER BY j.updated_at DESC"
+    cursor.execute(query, params)
+    keys = ("full_hash", "data_hash", "audio_path", "output_dir", "translator_choice", "voice_choice",
+            "subtitle_mode", "stage", "updated_at", "completed_sentences")
+    return [dict(zip(keys, row)) for row in cursor.fetchall()]
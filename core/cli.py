@@ -0,0 +1,246 @@
+# ========== core/cli.py ==========
+"""
+Headless batch entry point: runs many files through core.pipeline.process_file
+without the Kivy UI. Files are spread over worker processes that keep their
+models loaded between files; a JSON summary with per-file stage timings and
+cache hits is printed to stdout (pipeline messages go to stderr).
+
+    python -m core.cli lectures/ "talks/*.mp3" -t h -v female -s 1 -j 2
+    python -m core.cli talk.mp3 -s english,sequential
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import traceback
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+MEDIA_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac", ".ogg", ".mp4", ".mkv", ".webm")
+
+TRANSLATORS = {"gpt": "g", "deepl": "d", "lara": "l", "laraapi": "l", "huggingface": "h", "hf": "h", "original": "n"}
+SUBTITLE_MODES = {
+    "english": "0",
+    "sequential": "1",
+    "simultaneous": "2",
+    "ru-subtitles": "3",
+    "bilingual-ru-subtitles": "4",
+}
+
+
+def expand_inputs(inputs, extensions=MEDIA_EXTENSIONS, output_dir=None):
+    """Files, directories (searched recursively) and glob patterns -> sorted unique media paths.
+
+    Directories and globs skip the pipeline's own outputs: files named like an
+    artifact, and anything under `output_dir`. Files named explicitly are kept.
+    """
+    from core.outputs import is_output_path
+    skip_dir = os.path.join(os.path.abspath(output_dir), "") if output_dir else None
+
+    def wanted(path):
+        return not is_output_path(path) and not (skip_dir and os.path.abspath(path).startswith(skip_dir))
+
+    found = []
+    for item in inputs:
+        magic = glob.has_magic(item)
+        paths = glob.glob(item, recursive=True) if magic else [item]
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    found.extend(p for p in (os.path.join(root, n) for n in names if n.lower().endswith(extensions))
+                                 if wanted(p))
+            elif os.path.isfile(path):
+                if not magic or wanted(path):
+                    found.append(path)
+            else:
+                print(f"Skipping {path}: not found.", file=sys.stderr)
+    return sorted(set(os.path.abspath(p) for p in found))
+
+
+def _translator_code(value):
+    value = value.lower()
+    code = TRANSLATORS.get(value, value)
+    if code not in ("g", "d", "l", "h", "n"):
+        raise argparse.ArgumentTypeError(f"unknown translator {value!r}")
+    return code
+
+
+def _subtitle_mode(value):
+    """One mode or a comma-separated list, rendered together from one run."""
+    modes = []
+    for item in value.split(","):
+        mode = SUBTITLE_MODES.get(item.strip().lower(), item.strip())
+        if mode not in ("0", "1", "2", "3", "4"):
+            raise argparse.ArgumentTypeError(f"unknown subtitle mode {item!r}")
+        modes.append(mode)
+    return ",".join(sorted(set(modes)))
+
+
+def _artifacts(value):
+    from core.outputs import parse_artifacts
+    try:
+        return parse_artifacts(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _warm_worker(translator_code, subtitle_mode, whisper=True):
+    """Load the models every file needs once per worker process."""
+    from core.models import registry, WHISPER_MODEL
+    from core.segmentation import SEGMENTER, spacy_available
+    with contextlib.redirect_stdout(sys.stderr):
+        if whisper:
+            registry.whisper(WHISPER_MODEL)
+        if SEGMENTER == "spacy" and spacy_available():
+            registry.spacy_senter()
+        if translator_code == "h" and subtitle_mode.strip("0,"):
+            registry.hf_translator()
+
+
+def _process_one(path, output_dir, translator_code, voice_choice, subtitle_mode, trace_dir=None,
+                 artifacts=None):
+    from core.pipeline import process_file
+    result = {"file": path, "status": "ok"}
+    t0 = time.time()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            result["report"] = process_file(
+                audio_path=path,
+                output_dir=output_dir or os.path.dirname(path),
+                translator_code=translator_code,
+                voice_choice=voice_choice,
+                subtitle_mode=subtitle_mode,
+                trace_dir=trace_dir,
+                artifacts=artifacts,
+            )
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc(file=sys.stderr)
+    result["seconds"] = round(time.time() - t0, 3)
+    return result
+
+
+def _process_group(paths, *args):
+    """Process copies of one file in order: the later ones replay the first one's cache rows."""
+    return [_process_one(path, *args) for path in paths]
+
+
+def _group_by_content(files):
+    """Lists of paths with the same content hash, in input order."""
+    from core.pipeline import content_hash
+    groups = {}
+    for path in files:
+        try:
+            key = content_hash(path)
+        except OSError:
+            # Unreadable: the worker reports it.
+            key = path
+        groups.setdefault(key, []).append(path)
+    return list(groups.values())
+
+
+def run_batch(files, output_dir, translator_code, voice_choice, subtitle_mode, workers=1, warm=True,
+              trace_dir=None, artifacts=None):
+    """Process `files` and return their results in input order."""
+    from core.text_ingest import is_text_input
+    args = (output_dir, translator_code, voice_choice, subtitle_mode, trace_dir, artifacts)
+    # Text inputs never load Whisper.
+    warm_args = (translator_code, subtitle_mode, not all(is_text_input(path) for path in files))
+    if workers <= 1:
+        if warm:
+            _warm_worker(*warm_args)
+        return [_process_one(path, *args) for path in files]
+
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    initializer = _warm_worker if warm else None
+    # Copies of one file share cache rows and a pipeline job, so they never run at the same time.
+    groups = _group_by_content(files)
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=initializer,
+                             initargs=warm_args) as pool:
+        futures = {pool.submit(_process_group, paths, *args): paths for paths in groups}
+        for future in as_completed(futures):
+            try:
+                group_results = future.result()
+            except Exception as e:
+                # The worker process died (e.g. out of memory loading a model): record it and go on.
+                error = f"{type(e).__name__}: {e}"
+                group_results = [{"file": path, "status": "error", "error": error, "seconds": None}
+                                 for path in futures[future]]
+            for result in group_results:
+                results[result["file"]] = result
+                print(f"[{len(results)}/{len(files)}] {result['status']}: {result['file']}", file=sys.stderr)
+    return [results[path] for path in files]
+
+
+def build_parser():
+    from core.outputs import ARTIFACTS
+    parser = argparse.ArgumentParser(prog="python -m core.cli", description=__doc__.split("\n\n")[0])
+    parser.add_argument("inputs", nargs="+", help="media or .txt/.pdf/.epub files, directories (media only) or glob patterns")
+    parser.add_argument("-o", "--output-dir", help="where outputs are written (default: next to each input)")
+    parser.add_argument("-t", "--translator", type=_translator_code, default="h",
+                        help="g/gpt, d/deepl, l/lara, h/huggingface or n/original (default: h)")
+    parser.add_argument("-v", "--voice", choices=("male", "female"), default="male")
+    parser.add_argument("-s", "--subtitles", type=_subtitle_mode, default="1",
+                        help="0-4 or english, sequential, simultaneous, ru-subtitles, "
+                             "bilingual-ru-subtitles; several comma-separated modes are rendered "
+                             "from one run (default: 1)")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument("--whisper-workers", type=int,
+                        help="processes transcribing chunks of one file; each loads its own Whisper model "
+                             "(default: ELA_WHISPER_WORKERS, else 1)")
+    parser.add_argument("--no-warm", dest="warm", action="store_false",
+                        help="load models on first use instead of when a worker starts")
+    parser.add_argument("--summary", help="also write the JSON summary to this file")
+    parser.add_argument("--trace-dir", help="write a Chrome trace (chrome://tracing, Perfetto) per file here")
+    parser.add_argument("--artifacts", type=_artifacts,
+                        help="comma-separated outputs to write, from " + ",".join(ARTIFACTS)
+                             + " (default: the output_artifacts setting, else all but jsonl)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    files = expand_inputs(args.inputs, output_dir=args.output_dir)
+    if not files:
+        print("No input files found.", file=sys.stderr)
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    if args.whisper_workers:
+        # Read by core.transcribe when it is first imported, in this process and in spawned workers.
+        os.environ["ELA_WHISPER_WORKERS"] = str(args.whisper_workers)
+
+    from core.db_utils import init_cache_db
+    init_cache_db()
+
+    t0 = time.time()
+    results = run_batch(files, args.output_dir, args.translator, args.voice, args.subtitles,
+                        workers=args.workers, warm=args.warm, trace_dir=args.trace_dir,
+                        artifacts=args.artifacts)
+    failed = sum(r["status"] != "ok" for r in results)
+    summary = {
+        "translator": args.translator,
+        "voice": args.voice,
+        "subtitle_mode": args.subtitles,
+        "workers": args.workers,
+        "files": len(results),
+        "failed": failed,
+        "seconds": round(time.time() - t0, 3),
+        "results": results,
+    }
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    print(text)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
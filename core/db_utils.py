@@ -1,10 +1,12 @@
 # ela/core/db_utils.py
 import os
-import sqlite3
+
+from core.cache_engine import get_pool, migrate
 
 BASE_DIR = os.getcwd()
 SETTINGS_DB = os.path.join(BASE_DIR, 'settings.db')
 CACHE_DB = os.path.join(BASE_DIR, 'cache.db')
+MEDIA_CACHE_DIR = os.path.join(BASE_DIR, 'media_cache')
 
 # Схемы
 SETTINGS_SCHEMA = '''
@@ -18,45 +20,94 @@ CACHE_SCHEMA = '''
 PRAGMA foreign_keys = ON;
 CREATE TABLE IF NOT EXISTS file_cache (
     data_hash TEXT PRIMARY KEY,
-    semantic_units TEXT NOT NULL
+    semantic_units TEXT NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL DEFAULT 0
 );
 CREATE TABLE IF NOT EXISTS key_terms_cache (
     data_hash TEXT PRIMARY KEY,
     terms_json TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL DEFAULT 0,
     FOREIGN KEY(data_hash) REFERENCES file_cache(data_hash) ON DELETE CASCADE
 );
 CREATE TABLE IF NOT EXISTS translation_cache (
     full_hash TEXT PRIMARY KEY,
     data_hash TEXT NOT NULL,
     bilingual_objects TEXT NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL DEFAULT 0,
     FOREIGN KEY(data_hash) REFERENCES file_cache(data_hash) ON DELETE CASCADE
 );
+CREATE TABLE IF NOT EXISTS translation_revisions (
+    full_hash TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    delta TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (full_hash, revision),
+    FOREIGN KEY(full_hash) REFERENCES translation_cache(full_hash) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    table_name TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS file_fingerprints (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    data_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS translation_memory (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (provider, model, source)
+);
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    full_hash TEXT PRIMARY KEY,
+    data_hash TEXT NOT NULL,
+    audio_path TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    translator_choice TEXT NOT NULL,
+    voice_choice TEXT NOT NULL,
+    subtitle_mode TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS sentence_checkpoints (
+    full_hash TEXT NOT NULL,
+    sentence_id INTEGER NOT NULL,
+    sentence TEXT NOT NULL,
+    PRIMARY KEY (full_hash, sentence_id),
+    FOREIGN KEY(full_hash) REFERENCES pipeline_jobs(full_hash) ON DELETE CASCADE
+);
 '''
 
+def settings_pool(path: str = SETTINGS_DB):
+    return get_pool(path, lambda conn: conn.executescript(SETTINGS_SCHEMA))
+
+def cache_pool(path: str = CACHE_DB):
+    # Creating the pool migrates an existing cache.db to the current schema.
+    return get_pool(path, lambda conn: migrate(conn, CACHE_SCHEMA))
+
 def init_settings_db(path: str = SETTINGS_DB):
-    conn = sqlite3.connect(path)
-    conn.executescript(SETTINGS_SCHEMA)
-    conn.commit()
-    conn.close()
+    settings_pool(path)
 
 def init_cache_db(path: str = CACHE_DB):
-    conn = sqlite3.connect(path)
-    conn.executescript(CACHE_SCHEMA)
-    conn.commit()
-    conn.close()
+    cache_pool(path)
 
 def get_setting(key, default=None, path: str = SETTINGS_DB):
-    conn = sqlite3.connect(path)
-    cur = conn.cursor()
-    cur.execute('SELECT value FROM settings WHERE key = ?', (key,))
-    row = cur.fetchone()
-    conn.close()
+    with settings_pool(path).connection() as conn:
+        row = conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
     return row[0] if row else default
 
 def set_setting(key, value, path: str = SETTINGS_DB):
-    conn = sqlite3.connect(path)
-    cur = conn.cursor()
-    cur.execute('REPLACE INTO settings (key,value) VALUES (?,?)', (key, value))
-    conn.commit()
-    conn.close()
+    with settings_pool(path).connection() as conn:
+        conn.execute('REPLACE INTO settings (key,value) VALUES (?,?)', (key, value))
+        conn.commit()
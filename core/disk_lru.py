@@ -0,0 +1,82 @@
+# ========== core/disk_lru.py ==========
+"""
+Base for on-disk caches of whole files (core.audio_store, core.source_audio).
+Entries are the files with one extension under a root directory; a file's mtime
+is its last use, and the oldest are removed first once the cache grows past
+its byte quota. Hits, misses and evictions are counted for the run report.
+"""
+
+import os
+import threading
+
+
+class DiskLRU:
+    # Extension of the files that count as entries; staging files never match it.
+    extension = None
+
+    def __init__(self, root, quota_mb):
+        self.root = root
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def touch(self, path):
+        """Mark an entry as recently used."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(self.extension):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _remove(self, path):
+        os.remove(path)
+
+    def trim(self, keep=()):
+        """Evict least-recently-used entries, never those in `keep`, until the cache fits its quota."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.quota_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                self._remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,76 @@
+# ========== core/hashing.py ==========
+"""
+Streaming content hashing of input media and a stat-based fingerprint index,
+so unchanged files are recognised without reading them again.
+"""
+
+import os
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE, progress=None):
+    """SHA-256 of a file read through a single fixed-size buffer."""
+    h = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    total = os.path.getsize(path)
+    done = last_pct = 0
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+            done += n
+            pct = int(done / total * 100) if total else 100
+            if progress and pct != last_pct:
+                progress(pct)
+                last_pct = pct
+    return h.hexdigest()
+
+
+def settings_hash(data_hash, translator_choice, subtitle_mode, voice_choice):
+    """Cache key of a translation run, derived from the content hash and settings."""
+    vc = voice_choice if voice_choice else ""
+    return hashlib.sha256(
+        (data_hash + translator_choice + subtitle_mode + vc).encode()
+    ).hexdigest()
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def lookup_fingerprint(cursor, path):
+    """Return the cached data_hash for `path` if size, mtime and inode are unchanged."""
+    abspath, size, mtime_ns, inode = _fingerprint(path)
+    cursor.execute(
+        "SELECT data_hash FROM file_fingerprints WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+        (abspath, size, mtime_ns, inode)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def store_fingerprint(cursor, path, data_hash):
+    abspath, size, mtime_ns, inode = _fingerprint(path)
+    cursor.execute(
+        "REPLACE INTO file_fingerprints (path, size, mtime_ns, inode, data_hash) VALUES (?, ?, ?, ?, ?)",
+        (abspath, size, mtime_ns, inode, data_hash)
+    )
+
+
+def file_data_hash(cursor, path, progress=None):
+    """Content hash of `path`, served from the fingerprint index when possible.
+
+    Returns (data_hash, from_index).
+    """
+    data_hash = lookup_fingerprint(cursor, path)
+    if data_hash is not None:
+        return data_hash, True
+    data_hash = hash_file(path, progress=progress)
+    store_fingerprint(cursor, path, data_hash)
+    return data_hash, False
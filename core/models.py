@@ -0,0 +1,179 @@
+# ========== core/models.py ==========
+"""
+Process-wide registry of heavy models (Whisper, spaCy, HuggingFace translator).
+Each backend is loaded once per process and shared between pipeline runs;
+least-recently-used models are evicted when the configured memory budget is exceeded.
+"""
+
+import os
+import gc
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET_MB = int(os.getenv("ELA_MODEL_MEMORY_MB", "8192"))
+
+WHISPER_MODEL = "medium"
+SPACY_MODEL = "en_core_web_sm"
+HF_TRANSLATION_MODEL = "Helsinki-NLP/opus-mt-en-ru"
+
+
+def _rss_bytes():
+    """Current resident set size of this process, or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _torch_bytes(module):
+    """Size of parameters and buffers of a torch module, or 0 if it is not one."""
+    params = getattr(module, "parameters", None)
+    buffers = getattr(module, "buffers", None)
+    if not callable(params):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in params())
+    if callable(buffers):
+        total += sum(b.numel() * b.element_size() for b in buffers())
+    return total
+
+
+def _estimate_bytes(obj, rss_delta):
+    size = _torch_bytes(obj) or _torch_bytes(getattr(obj, "model", None))
+    if not size and rss_delta:
+        size = max(rss_delta, 0)
+    return size
+
+
+class _Entry:
+    __slots__ = ("model", "bytes", "load_seconds", "loaded_at", "uses")
+
+    def __init__(self, model, size, load_seconds):
+        self.model = model
+        self.bytes = size
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.uses = 0
+
+
+class ModelRegistry:
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def configure(self, budget_mb):
+        with self._lock:
+            self.budget_bytes = int(budget_mb * 1024 * 1024)
+            self._enforce_budget()
+
+    def get(self, key, loader):
+        """Return the model stored under `key`, calling `loader()` on first use."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                rss_before = _rss_bytes()
+                t0 = time.time()
+                model = loader()
+                load_seconds = time.time() - t0
+                rss_after = _rss_bytes()
+                rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+                entry = _Entry(model, _estimate_bytes(model, rss_delta), load_seconds)
+                self._entries[key] = entry
+                print(f"Loaded model {key} in {load_seconds:.1f} sec ({entry.bytes / 2**20:.0f} MB).")
+                self._enforce_budget(keep=key)
+            self._entries.move_to_end(key)
+            entry.uses += 1
+            return entry.model
+
+    def whisper(self, name=WHISPER_MODEL):
+        def load():
+            import whisper
+            return whisper.load_model(name)
+        return self.get(("whisper", name), load)
+
+    @staticmethod
+    def _load_spacy(name, **kwargs):
+        import spacy
+        try:
+            return spacy.load(name, **kwargs)
+        except OSError:
+            from spacy.cli import download
+            download(name)
+            return spacy.load(name, **kwargs)
+
+    def spacy(self, name=SPACY_MODEL):
+        return self.get(("spacy", name), lambda: self._load_spacy(name))
+
+    def spacy_senter(self, name=SPACY_MODEL):
+        """`name` reduced to sentence segmentation: its senter, else its parser, else a rule-based sentencizer."""
+        def load():
+            nlp = self._load_spacy(name)
+            if "senter" in nlp.component_names:
+                nlp.enable_pipe("senter")
+                keep = ["senter"]
+            else:
+                keep = [p for p in ("tok2vec", "parser") if p in nlp.component_names]
+            if not keep:
+                nlp.add_pipe("sentencizer")
+                keep = ["sentencizer"]
+            nlp.select_pipes(enable=keep)
+            return nlp
+        return self.get(("spacy-senter", name), load)
+
+    def hf_translator(self, model=HF_TRANSLATION_MODEL):
+        def load():
+            from transformers import pipeline as hf_pipeline
+            return hf_pipeline("translation", model=model)
+        return self.get(("hf", model), load)
+
+    def evict(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            print(f"Evicted model {key} ({entry.bytes / 2**20:.0f} MB).")
+            del entry
+            self._release_memory()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._release_memory()
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(e.bytes for e in self._entries.values())
+
+    def stats(self):
+        """Per-model load time, estimated resident size and use count, LRU first."""
+        with self._lock:
+            return [
+                {
+                    "key": "/".join(key),
+                    "bytes": e.bytes,
+                    "load_seconds": round(e.load_seconds, 3),
+                    "loaded_at": e.loaded_at,
+                    "uses": e.uses,
+                }
+                for key, e in self._entries.items()
+            ]
+
+    def _enforce_budget(self, keep=None):
+        while self.resident_bytes() > self.budget_bytes:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                break
+            self.evict(victim)
+
+    @staticmethod
+    def _release_memory():
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+registry = ModelRegistry()
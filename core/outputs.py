@@ -0,0 +1,150 @@
+# ========== core/outputs.py ==========
+"""
+Output artifacts of a pipeline run.
+The sentence list is serialized once; the same bytes go into the cache blob and
+every JSON artifact (_semantic_units_, _bilingual_objects_ and the .txt). The
+optional JSONL artifact is streamed one sentence per line as sentences finish.
+Which artifacts are written is a setting ("output_artifacts" in settings.db,
+comma-separated) or an explicit list from the caller. When several subtitle
+modes are rendered in one run, every mode gets its own srt/mp3/mp4, tagged
+with the mode name.
+"""
+
+import os
+import re
+import json
+
+from core.cache_engine import json_default
+
+ARTIFACTS = ("semantic_units", "bilingual_objects", "txt", "jsonl", "srt", "mp3", "mp4")
+DEFAULT_ARTIFACTS = ("semantic_units", "bilingual_objects", "txt", "srt", "mp3", "mp4")
+JSON_ARTIFACTS = ("semantic_units", "bilingual_objects", "txt")
+MEDIA_ARTIFACTS = ("srt", "mp3", "mp4")
+ARTIFACTS_SETTING = "output_artifacts"
+
+SUBTITLE_MODES = ("0", "1", "2", "3", "4")
+SPEECH_MODES = ("1", "2", "4")
+MODE_TAGS = {"0": "english", "1": "sequential", "2": "simultaneous", "3": "ru-subtitles", "4": "bilingual-ru-subtitles"}
+# File name suffix of each translator's outputs.
+TRANSLATOR_SUFFIXES = {"gpt": "gpt", "deepl": "deepl", "lara": "lara", "hf": "hf", "original": "en"}
+DEFAULT_SUFFIX = "hf"
+
+_OUTPUT_NAME = re.compile(
+    r"_(?:(?:semantic_units|bilingual_objects)_(?:{sfx})\.json|bilingual_(?:{sfx})(?:_(?:{tags}))?\.(?:{ext}))$".format(
+        sfx="|".join(set(TRANSLATOR_SUFFIXES.values())),
+        tags="|".join(MODE_TAGS.values()),
+        ext="|".join(a for a in ARTIFACTS if a not in ("semantic_units", "bilingual_objects")),
+    ),
+    re.IGNORECASE,
+)
+
+
+def parse_artifacts(value):
+    """'mp3,srt' or an iterable -> tuple of artifact names in canonical order."""
+    names = [v.strip().lower() for v in (value.split(",") if isinstance(value, str) else value) if v.strip()]
+    unknown = [n for n in names if n not in ARTIFACTS]
+    if unknown:
+        raise ValueError(f"Unknown output artifacts: {', '.join(unknown)} (choose from {', '.join(ARTIFACTS)})")
+    return tuple(a for a in ARTIFACTS if a in names)
+
+
+def parse_modes(value):
+    """'1', '0,1', 1 or an iterable -> tuple of subtitle modes in canonical order."""
+    if isinstance(value, (int, str)):
+        value = str(value).split(",")
+    modes = {str(v).strip() for v in value} - {""}
+    unknown = sorted(modes - set(SUBTITLE_MODES))
+    if unknown or not modes:
+        raise ValueError(f"Unknown subtitle modes: {', '.join(unknown) or 'none given'} "
+                         f"(choose from {', '.join(SUBTITLE_MODES)})")
+    return tuple(m for m in SUBTITLE_MODES if m in modes)
+
+
+def translation_mode(modes):
+    """The one mode whose translation serves every mode in `modes`.
+
+    Russian speech covers all modes, Russian text covers 0 and 3. Using a single
+    mode keeps the translation_cache key equal to that of a single-mode run.
+    """
+    for mode in SPEECH_MODES + ("3", "0"):
+        if mode in modes:
+            return mode
+
+
+def is_output_path(path):
+    """Whether `path` is named like an artifact of some earlier run (see OutputWriter.path)."""
+    return _OUTPUT_NAME.search(os.path.basename(path)) is not None
+
+
+def configured_artifacts():
+    from core.db_utils import get_setting
+    value = get_setting(ARTIFACTS_SETTING)
+    return parse_artifacts(value) if value else DEFAULT_ARTIFACTS
+
+
+def serialize(sentences):
+    """The one JSON encoding of the sentence list, shared by the cache and the JSON artifacts."""
+    return json.dumps(sentences, ensure_ascii=False, indent=2, default=json_default).encode("utf-8")
+
+
+class OutputWriter:
+    def __init__(self, output_dir, audio_path, suffix, artifacts=DEFAULT_ARTIFACTS):
+        base = os.path.splitext(os.path.basename(audio_path))[0]
+        self.base_path = os.path.join(output_dir, base)
+        self.suffix = suffix
+        self.artifacts = tuple(artifacts)
+        self.written = []
+        self._stream = None
+
+    def wants(self, *artifacts):
+        return any(a in self.artifacts for a in artifacts)
+
+    def path(self, artifact, mode=None):
+        if artifact in ("semantic_units", "bilingual_objects"):
+            return f"{self.base_path}_{artifact}_{self.suffix}.json"
+        tag = f"_{MODE_TAGS[mode]}" if mode else ""
+        return f"{self.base_path}_bilingual_{self.suffix}{tag}.{artifact}"
+
+    def _record(self, path):
+        if path not in self.written:
+            self.written.append(path)
+        return path
+
+    def write_json(self, payload):
+        """Write the serialized sentences to every enabled JSON artifact."""
+        for artifact in JSON_ARTIFACTS:
+            if artifact in self.artifacts:
+                with open(self.path(artifact), "wb") as f:
+                    f.write(payload)
+                self._record(self.path(artifact))
+
+    def media_paths(self, mode=None):
+        """{artifact: path or None} for the subtitle and ffmpeg outputs; `mode` tags the file names."""
+        return {a: (self.path(a, mode) if a in self.artifacts else None) for a in MEDIA_ARTIFACTS}
+
+    def record(self, path):
+        if path:
+            self._record(path)
+
+    # Streaming JSONL
+
+    def open_stream(self):
+        if "jsonl" in self.artifacts and self._stream is None:
+            self._stream = open(self.path("jsonl"), "w", encoding="utf-8")
+            self._record(self.path("jsonl"))
+
+    def append(self, sentence):
+        """Write one finished sentence as a JSONL line; readers can follow the file while it grows."""
+        if self._stream is not None:
+            self._stream.write(json.dumps(sentence, ensure_ascii=False, default=json_default))
+            self._stream.write("\n")
+            self._stream.flush()
+
+    def extend(self, sentences):
+        for s in sentences:
+            self.append(s)
+
+    def close_stream(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
@@ -3,20 +3,116 @@
 Wrapper to run the main pipeline logic from ttw.py with arguments provided by UI or CLI.
 """
 import os
+import time
 import tempfile
-from core import ttw
-
-def process_file(audio_path, output_dir, translator_code, voice_choice, subtitle_mode, ui_callback=None):
-    # Use a temporary directory for intermediate files during processing
-    with tempfile.TemporaryDirectory() as tmpdir:
-        db_config = {"database": "cache.db"}
-        ttw.run_pipeline_main(
-            audio_path=audio_path,
-            translator_choice=translator_code,
-            voice_choice=voice_choice,
-            subtitle_mode=str(subtitle_mode),
-            tmpdir=tmpdir,
-            db_config=db_config,
-            output_dir=output_dir,
-            ui_callback=ui_callback
-        )
+from core import checkpoints
+from core.db_utils import cache_pool
+
+CACHE_DB = "cache.db"
+
+
+def process_file(audio_path, output_dir, translator_code, voice_choice, subtitle_mode, ui_callback=None,
+                 trace_dir=None, artifacts=None, edits=None):
+    """Process one file; returns the run report of ttw.run_pipeline_main.
+
+    subtitle_mode may list several modes ("0,1"); all of them are rendered from one run.
+    With trace_dir set, a Chrome trace of the run is written there, also when it fails.
+    `artifacts` limits the outputs written (default: the output_artifacts setting).
+    `edits` revises the cached translation instead (see revise_translation).
+    """
+    from core import ttw
+    from core.tracing import Tracer
+    tracer = Tracer(os.path.basename(audio_path))
+    try:
+        # Use a temporary directory for intermediate files during processing
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_config = {"database": CACHE_DB}
+            report = ttw.run_pipeline_main(
+                audio_path=audio_path,
+                translator_choice=translator_code,
+                voice_choice=voice_choice,
+                subtitle_mode=subtitle_mode,
+                tmpdir=tmpdir,
+                db_config=db_config,
+                output_dir=output_dir,
+                ui_callback=ui_callback,
+                tracer=tracer,
+                artifacts=artifacts,
+                edits=edits
+            )
+    finally:
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+            name = f"{os.path.splitext(os.path.basename(audio_path))[0]}_{time.strftime('%Y%m%d-%H%M%S')}.trace.json"
+            trace_path = tracer.write(os.path.join(trace_dir, name))
+    if trace_dir:
+        report["trace"] = trace_path
+    return report
+
+
+def list_interrupted_jobs():
+    """Jobs that stopped before finishing, newest first, with their stage and completed sentences."""
+    with cache_pool(CACHE_DB).connection() as conn:
+        return checkpoints.list_jobs(conn.cursor())
+
+
+def resume_job(full_hash, ui_callback=None):
+    """Run an interrupted job again with its original arguments; finished sentences are reused."""
+    with cache_pool(CACHE_DB).connection() as conn:
+        job = checkpoints.get_job(conn.cursor(), full_hash)
+    if job is None:
+        raise ValueError(f"No interrupted job with hash {full_hash}")
+    if not os.path.exists(job["audio_path"]):
+        raise FileNotFoundError(job["audio_path"])
+    return process_file(
+        audio_path=job["audio_path"],
+        output_dir=job["output_dir"],
+        translator_code=job["translator_choice"],
+        voice_choice=job["voice_choice"],
+        subtitle_mode=job["subtitle_mode"],
+        ui_callback=ui_callback
+    )
+
+
+def find_source(data_hash):
+    """Path of an existing file last seen with content hash `data_hash`, or None."""
+    with cache_pool(CACHE_DB).connection() as conn:
+        paths = [row[0] for row in conn.execute("SELECT path FROM file_fingerprints WHERE data_hash = ?", (data_hash,))]
+    return next((p for p in paths if os.path.exists(p)), None)
+
+
+def content_hash(path):
+    """Content hash of `path`, through the fingerprint index in cache.db."""
+    from core.hashing import file_data_hash
+    with cache_pool(CACHE_DB).connection() as conn:
+        data_hash, _ = file_data_hash(conn.cursor(), path)
+        conn.commit()
+    return data_hash
+
+
+def revise_translation(data_hash, edited_sentences, output_dir, translator_code, voice_choice, subtitle_mode,
+                       audio_path=None, ui_callback=None, trace_dir=None, artifacts=None):
+    """Apply transcript edits to the cached translation of `data_hash` and regenerate its outputs.
+
+    edited_sentences is the full sentence list with corrected "text_eng" (e.g. a
+    _bilingual_objects_ output after editing); only sentences whose text changed
+    are translated and synthesized again. Raises ValueError when nothing is cached
+    for these settings and FileNotFoundError when the source file is gone.
+    `artifacts` limits the outputs written, as in process_file.
+    """
+    audio_path = audio_path or find_source(data_hash)
+    if audio_path is None:
+        raise FileNotFoundError(f"No source file with hash {data_hash}")
+    if content_hash(audio_path) != data_hash:
+        raise ValueError(f"{audio_path} does not have content hash {data_hash}")
+    return process_file(
+        audio_path=audio_path,
+        output_dir=output_dir,
+        translator_code=translator_code,
+        voice_choice=voice_choice,
+        subtitle_mode=subtitle_mode,
+        ui_callback=ui_callback,
+        trace_dir=trace_dir,
+        artifacts=artifacts,
+        edits=edited_sentences
+    )
@@ -0,0 +1,55 @@
+# ========== core/render.py ==========
+"""
+Single-pass ffmpeg rendering of the assembled timeline.
+Raw PCM is streamed to one ffmpeg process that writes both the MP3 and the MP4
+(generated colour background with burned-in ASS subtitles).
+"""
+
+import subprocess
+import tempfile
+
+VIDEO_SIZE = (1280, 720)
+VIDEO_FPS = 2
+WRITE_CHUNK_FRAMES = 1 << 16
+
+
+def escape_filter_path(path):
+    return path.replace('\\', '\\\\').replace(':', '\\:')
+
+
+def render_command(frame_rate, channels, mp3_out, mp4_out, ass_path, size=VIDEO_SIZE, fps=VIDEO_FPS):
+    """ffmpeg arguments reading s16le PCM from stdin; either output may be None."""
+    cmd = [
+        "ffmpeg", "-y", "-nostats", "-loglevel", "error",
+        "-f", "s16le", "-ar", str(frame_rate), "-ac", str(channels), "-i", "pipe:0",
+    ]
+    if mp4_out:
+        cmd += [
+            "-f", "lavfi", "-i", f"color=c=black:s={size[0]}x{size[1]}:r={fps}",
+            "-map", "1:v", "-map", "0:a",
+            "-vf", f"ass='{escape_filter_path(ass_path)}'",
+            "-c:v", "libx264", "-tune", "stillimage", "-shortest",
+            "-c:a", "aac", "-b:a", "192k",
+            mp4_out,
+        ]
+    if mp3_out:
+        cmd += ["-map", "0:a", "-c:a", "libmp3lame", mp3_out]
+    return cmd
+
+
+def render_outputs(samples, frame_rate, mp3_out, mp4_out, ass_path):
+    """Encode an int16 (frames, channels) array into the MP3 and MP4 outputs with one ffmpeg run."""
+    channels = samples.shape[1]
+    cmd = render_command(frame_rate, channels, mp3_out, mp4_out, ass_path)
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=err)
+        try:
+            for i in range(0, len(samples), WRITE_CHUNK_FRAMES):
+                proc.stdin.write(memoryview(samples[i:i + WRITE_CHUNK_FRAMES]).cast("B"))
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        code = proc.wait()
+        if code != 0:
+            err.seek(0)
+            raise subprocess.CalledProcessError(code, cmd, stderr=err.read().decode(errors="replace"))
@@ -0,0 +1,109 @@
+# ========== core/revisions.py ==========
+"""
+Revisions of a cached translation after transcript edits.
+An edited sentence list is diffed against the cached bilingual objects by
+sentence id; only sentences whose English text changed are translated and
+synthesized again. Each edit is stored as a delta (changed sentences and
+removed ids) in translation_revisions on top of the translation_cache row,
+and applied in order whenever that row is read. Deleting the row removes its
+revisions through ON DELETE CASCADE; after COMPACT_AFTER revisions they are
+folded into the row.
+"""
+
+from core.cache_engine import decode_blob, encode_blob
+
+COMPACT_AFTER = 20
+
+
+def load(cursor, full_hash):
+    """Deltas of `full_hash` in revision order."""
+    cursor.execute("SELECT delta FROM translation_revisions WHERE full_hash = ? ORDER BY revision", (full_hash,))
+    return [decode_blob(row[0]) for row in cursor.fetchall()]
+
+
+def apply(sentences, delta):
+    """Sentence list with `delta` applied; new sentences are placed by start time."""
+    changed = {s["id"]: s for s in delta["changed"]}
+    removed = set(delta["removed"])
+    result = [changed.pop(s["id"], s) for s in sentences if s["id"] not in removed]
+    if changed:
+        result = sorted(result + list(changed.values()), key=lambda s: (s["start"], s["id"]))
+    return result
+
+
+def apply_all(cursor, full_hash, sentences):
+    """Returns (sentences, revision): the current version of a cached translation."""
+    deltas = load(cursor, full_hash)
+    for delta in deltas:
+        sentences = apply(sentences, delta)
+    return sentences, len(deltas)
+
+
+def _units(tokens, start, end, ids):
+    """Units of an edited sentence, spread evenly over its time span."""
+    step = (end - start) / max(len(tokens), 1)
+    return [
+        {"id": uid, "type": utype, "text": tok,
+         "audio": {"origin_start": start + i * step, "origin_end": start + (i + 1) * step}}
+        for i, ((utype, tok), uid) in enumerate(zip(tokens, ids))
+    ]
+
+
+def edit(current, edited):
+    """Apply an edited sentence list to the current version.
+
+    `edited` holds dicts with "id" and "text_eng" (optionally "start"/"end"); ids
+    missing from it are removed. Unchanged sentences are the objects of `current`;
+    changed and new ones carry no translation yet. Returns (sentences, delta).
+    """
+    from core.units import tokenize
+    by_id = {s["id"]: s for s in current}
+    next_unit = 1 + max((u["id"] for s in current for u in s.get("units", [])), default=0)
+    sentences, changed = [], []
+    for e in edited:
+        old = by_id.get(e["id"])
+        text = e["text_eng"].strip()
+        start, end = e.get("start"), e.get("end")
+        if old is not None:
+            start = old["start"] if start is None else start
+            end = old["end"] if end is None else end
+            if text == old["text_eng"] and (start, end) == (old["start"], old["end"]):
+                sentences.append(old)
+                continue
+        elif start is None or end is None:
+            raise ValueError(f"New sentence {e['id']} needs start and end times")
+        # Edited sentences keep their unit ids; extra tokens get ids past the last one in use.
+        tokens = list(tokenize(text))
+        ids = [u["id"] for u in old.get("units", [])] if old is not None else []
+        need = max(len(tokens) - len(ids), 0)
+        ids += range(next_unit, next_unit + need)
+        next_unit += need
+        s = {"id": e["id"], "text_eng": text, "units": _units(tokens, start, end, ids), "start": start, "end": end}
+        sentences.append(s)
+        changed.append(s)
+    sentences.sort(key=lambda s: (s["start"], s["id"]))
+    kept = {s["id"] for s in sentences}
+    delta = {"changed": changed, "removed": [sid for sid in by_id if sid not in kept]}
+    return sentences, delta
+
+
+def save(cursor, full_hash, delta):
+    """Store `delta`, its changed sentences translated by now, as the next revision; returns its number.
+
+    The delta's size is charged to the translation_cache row so its quota covers revisions.
+    """
+    blob = encode_blob(delta)
+    cursor.execute("SELECT COALESCE(MAX(revision), 0) + 1 FROM translation_revisions WHERE full_hash = ?",
+                   (full_hash,))
+    revision = cursor.fetchone()[0]
+    cursor.execute("INSERT INTO translation_revisions (full_hash, revision, delta) VALUES (?, ?, ?)",
+                   (full_hash, revision, blob))
+    cursor.execute("UPDATE translation_cache SET bytes = bytes + ? WHERE full_hash = ?", (len(blob), full_hash))
+    return revision
+
+
+def compact(cursor, full_hash, blob):
+    """Replace the cached translation with `blob`, the encoded current version, and drop its deltas."""
+    cursor.execute("DELETE FROM translation_revisions WHERE full_hash = ?", (full_hash,))
+    cursor.execute("UPDATE translation_cache SET bilingual_objects = ?, bytes = ? WHERE full_hash = ?",
+                   (blob, len(blob), full_hash))
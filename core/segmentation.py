@@ -0,0 +1,105 @@
+# ========== core/segmentation.py ==========
+"""
+Sentence segmentation of semantic units.
+"punct" ends sentences at ".?!" units (core.units.group_by_sentence). "spacy"
+feeds the transcript to spaCy's sentence segmenter in batched nlp.pipe calls,
+with every other component disabled and n_process workers for long inputs,
+and maps the sentence spans back to unit indices, so unpunctuated ASR output
+is split too. Either way a sentence's units are a slice of the UnitArray and
+keep their source timestamps.
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+
+SEGMENTERS = ("punct", "spacy")
+SEGMENTER = os.getenv("ELA_SEGMENTER", "spacy")
+# Units per spaCy document; documents end at sentence-final punctuation where there is any.
+DOC_UNITS = 2000
+BATCH_SIZE = int(os.getenv("ELA_SPACY_BATCH", "16"))
+PROCESSES = int(os.getenv("ELA_SPACY_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# With fewer documents, starting worker processes costs more than it saves.
+PARALLEL_MIN_DOCS = 8
+
+_warned = False
+
+
+def spacy_available():
+    import importlib.util
+    return importlib.util.find_spec("spacy") is not None
+
+
+def _documents(n, final_ends):
+    """(a, b) unit ranges of at most DOC_UNITS units, cut after the last final punctuation inside."""
+    docs, a = [], 0
+    while a < n:
+        b = min(a + DOC_UNITS, n)
+        if b < n:
+            i = bisect_right(final_ends, b) - 1
+            if i >= 0 and final_ends[i] > a:
+                b = final_ends[i]
+        docs.append((a, b))
+        a = b
+    return docs
+
+
+def _doc_text(texts, is_symbol, a, b):
+    """Text of units[a:b] joined like sentence texts, and each unit's character offset in it."""
+    parts, offsets, pos = [], [], 0
+    for t, sym in zip(texts[a:b], is_symbol[a:b]):
+        if parts and not sym:
+            parts.append(" ")
+            pos += 1
+        offsets.append(pos)
+        parts.append(t)
+        pos += len(t)
+    return "".join(parts), offsets
+
+
+def sentence_ends(units, nlp, batch_size=BATCH_SIZE, processes=PROCESSES):
+    """Unit indices where spaCy's sentences end (the last one is len(units))."""
+    import numpy as np
+    texts = units.texts()
+    is_symbol = units.type_of("symbol")
+    final_ends = (np.flatnonzero(is_symbol & units.text_in((".", "?", "!"))) + 1).tolist()
+    is_symbol = is_symbol.tolist()
+    docs = _documents(len(texts), final_ends)
+    prepared = [_doc_text(texts, is_symbol, a, b) for a, b in docs]
+    n_process = processes if len(docs) >= PARALLEL_MIN_DOCS else 1
+    ends = []
+    for (a, b), (_, offsets), doc in zip(docs, prepared,
+                                         nlp.pipe((text for text, _ in prepared),
+                                                  batch_size=batch_size, n_process=n_process)):
+        for sent in doc.sents:
+            if sent.start_char:
+                ends.append(a + bisect_left(offsets, sent.start_char))
+        ends.append(b)
+    return sorted(set(ends))
+
+
+def segment_spacy(units, nlp=None):
+    from core.models import registry
+    from core.units import join_tokens, make_sentence
+    nlp = nlp or registry.spacy_senter()
+    texts = units.texts()
+    is_symbol = units.type_of("symbol").tolist()
+    sentences, a = [], 0
+    for sid, b in enumerate(sentence_ends(units, nlp), start=1):
+        sentences.append(make_sentence(units, sid, a, b, join_tokens(texts[a:b], is_symbol[a:b])))
+        a = b
+    return sentences
+
+
+def segment(units, method=SEGMENTER):
+    """Sentence dicts for `units` using `method` ("spacy" falls back to "punct" without spaCy)."""
+    global _warned
+    from core.units import group_by_sentence
+    if method not in SEGMENTERS:
+        raise ValueError(f"Unknown segmenter {method!r} (choose from {', '.join(SEGMENTERS)})")
+    if method == "spacy" and len(units):
+        if spacy_available():
+            return segment_spacy(units)
+        if not _warned:
+            print("spaCy is not installed; splitting sentences at punctuation.")
+            _warned = True
+    return group_by_sentence(units)
@@ -0,0 +1,163 @@
+# ========== core/source_audio.py ==========
+"""
+Decoded source audio, cached as raw PCM and memory-mapped.
+The input is decoded once with ffmpeg to 16-bit PCM at its own sample rate and
+channel count, stored under its content hash (data_hash) with a small JSON
+header, and opened as a read-only NumPy memmap: sentence windows are views into
+the page cache, not copies, so long inputs never sit in memory as a whole.
+Whisper's 16 kHz input is derived from the same file on later runs without
+decoding the original container again. The cache is trimmed least-recently-used
+first once it grows past its byte quota.
+"""
+
+import os
+import json
+import struct
+import shutil
+import tempfile
+import threading
+import subprocess
+
+from core.disk_lru import DiskLRU
+
+DEFAULT_QUOTA_MB = int(os.getenv("ELA_SOURCE_PCM_CACHE_MB", "8192"))
+SAMPLE_WIDTH = 2
+COPY_CHUNK = 1 << 20
+
+
+class SourceAudio:
+    """int16 PCM of one input as a (frames, channels) array backed by the cache file."""
+
+    def __init__(self, path, frame_rate, channels):
+        self.path = path
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self._samples = None
+
+    @property
+    def samples(self):
+        if self._samples is None:
+            import numpy as np
+            if os.path.getsize(self.path) == 0:
+                self._samples = np.zeros((0, self.channels), dtype=np.int16)
+            else:
+                self._samples = np.memmap(self.path, dtype="<i2", mode="r").reshape(-1, self.channels)
+        return self._samples
+
+    def input_args(self):
+        """ffmpeg arguments that read this file as input."""
+        return ["-f", "s16le", "-ar", str(self.frame_rate), "-ac", str(self.channels), "-i", self.path]
+
+
+def _read_wav_header(stream):
+    """(channels, frame_rate, bits) from a WAV stream, which is left at the start of the sample data."""
+    def read(n):
+        data = stream.read(n)
+        if len(data) != n:
+            raise EOFError("truncated WAV header")
+        return data
+
+    riff, _, wave = struct.unpack("<4sI4s", read(12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise ValueError("ffmpeg did not produce a WAV stream")
+    fmt = None
+    while True:
+        chunk, size = struct.unpack("<4sI", read(8))
+        if chunk == b"data":
+            if fmt is None:
+                raise ValueError("WAV stream without a fmt chunk")
+            return fmt
+        body = read(size + (size & 1))
+        if chunk == b"fmt ":
+            channels, frame_rate = struct.unpack("<HI", body[2:8])
+            bits = struct.unpack("<H", body[14:16])[0]
+            fmt = (channels, frame_rate, bits)
+
+
+def probe(audio_path):
+    """(frame_rate, channels, seconds) of the first audio stream, read by ffprobe without decoding."""
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries",
+           "stream=sample_rate,channels:format=duration", "-of", "json", audio_path]
+    info = json.loads(subprocess.run(cmd, capture_output=True, check=True).stdout)
+    if not info.get("streams"):
+        raise ValueError(f"No audio stream in {audio_path}")
+    stream = info["streams"][0]
+    return int(stream["sample_rate"]), int(stream["channels"]), float(info["format"]["duration"])
+
+
+def decode_to_cache(audio_path, pcm_path):
+    """Decode the first audio stream of `audio_path` to raw s16le PCM; returns (frame_rate, channels)."""
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", audio_path,
+           "-vn", "-acodec", "pcm_s16le", "-f", "wav", "pipe:1"]
+    with tempfile.TemporaryFile() as err, open(pcm_path, "wb") as out:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+        header = None
+        try:
+            header = _read_wav_header(proc.stdout)
+            shutil.copyfileobj(proc.stdout, out, COPY_CHUNK)
+        except (EOFError, ValueError):
+            # A failed ffmpeg run leaves a short stream; its error is reported below.
+            if proc.poll() is None:
+                proc.kill()
+            if proc.wait() == 0:
+                raise
+        finally:
+            proc.stdout.close()
+        if proc.wait():
+            err.seek(0)
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=err.read().decode(errors="replace"))
+    channels, frame_rate, bits = header
+    if bits != 8 * SAMPLE_WIDTH:
+        raise ValueError(f"expected 16-bit PCM from ffmpeg, got {bits}-bit")
+    return frame_rate, channels
+
+
+class SourceCache(DiskLRU):
+    extension = ".s16le"
+
+    def __init__(self, root, quota_mb=DEFAULT_QUOTA_MB):
+        super().__init__(root, quota_mb)
+
+    def paths(self, data_hash):
+        base = os.path.join(self.root, data_hash[:2], data_hash)
+        return base + self.extension, f"{base}.json"
+
+    def get(self, data_hash):
+        """SourceAudio of a cached decode, or None on a miss."""
+        pcm, meta = self.paths(data_hash)
+        try:
+            with open(meta, encoding="utf-8") as f:
+                info = json.load(f)
+            os.utime(pcm)
+        except (OSError, ValueError):
+            return None
+        return SourceAudio(pcm, info["frame_rate"], info["channels"])
+
+    def decode(self, data_hash, audio_path):
+        """Decode `audio_path` into the cache; the header is written last and marks the entry complete."""
+        pcm, meta = self.paths(data_hash)
+        os.makedirs(os.path.dirname(pcm), exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            frame_rate, channels = decode_to_cache(audio_path, pcm + suffix)
+            os.replace(pcm + suffix, pcm)
+            with open(meta + suffix, "w", encoding="utf-8") as f:
+                json.dump({"frame_rate": frame_rate, "channels": channels, "sample_width": SAMPLE_WIDTH}, f)
+            os.replace(meta + suffix, meta)
+        finally:
+            for tmp in (pcm + suffix, meta + suffix):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return SourceAudio(pcm, frame_rate, channels)
+
+    def open(self, data_hash, audio_path):
+        source = self.get(data_hash)
+        self._count(source is not None)
+        return source or self.decode(data_hash, audio_path)
+
+    def _remove(self, path):
+        # Without its header the entry no longer counts as cached.
+        meta = path[:-len(self.extension)] + ".json"
+        if os.path.exists(meta):
+            os.remove(meta)
+        os.remove(path)
@@ -0,0 +1,104 @@
+# ========== core/stages.py ==========
+"""
+Streaming translate -> TTS -> measure pipeline over bounded queues.
+Translation runs on one thread, speech synthesis is started on a second one, and
+the calling thread waits for clips and measures them, so sentence N+1 is being
+translated while N is synthesized and N-1 is measured. Sentences leave the
+pipeline in their original order.
+"""
+
+import queue
+import threading
+
+QUEUE_SIZE = 64
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def run_translation_stages(sentences, translate, start_synthesis, finish, batch_size=16,
+                           queue_size=QUEUE_SIZE, on_done=None):
+    """Run the three stages over `sentences`.
+
+    translate(batch)        fills text_ru for a list of sentences (translation thread)
+    start_synthesis(s)      starts TTS without blocking and returns a handle (synthesis thread)
+    finish(s, handle)       waits for the clip and fills the remaining fields (calling thread)
+    on_done(s, done, total) is called on the calling thread after each sentence completes
+    """
+    stop = threading.Event()
+    translated = queue.Queue(maxsize=queue_size)
+    synthesizing = queue.Queue(maxsize=queue_size)
+
+    def translation_worker():
+        try:
+            for i in range(0, len(sentences), batch_size):
+                if stop.is_set():
+                    return
+                batch = sentences[i:i + batch_size]
+                translate(batch)
+                for s in batch:
+                    if not _put(translated, s, stop):
+                        return
+            _put(translated, _END, stop)
+        except BaseException as e:
+            _put(translated, _Failure(e), stop)
+
+    def synthesis_worker():
+        try:
+            while True:
+                item = _get(translated, stop)
+                if item is _END or isinstance(item, _Failure):
+                    _put(synthesizing, item, stop)
+                    return
+                if not _put(synthesizing, (item, start_synthesis(item)), stop):
+                    return
+        except BaseException as e:
+            _put(synthesizing, _Failure(e), stop)
+
+    workers = [
+        threading.Thread(target=translation_worker, name="stage-translate", daemon=True),
+        threading.Thread(target=synthesis_worker, name="stage-synthesize", daemon=True),
+    ]
+    for w in workers:
+        w.start()
+
+    done = 0
+    try:
+        while True:
+            item = synthesizing.get()
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            s, handle = item
+            finish(s, handle)
+            done += 1
+            if on_done:
+                on_done(s, done, len(sentences))
+    finally:
+        stop.set()
+        for w in workers:
+            w.join()
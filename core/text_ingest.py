@@ -0,0 +1,136 @@
+# ========== core/text_ingest.py ==========
+"""
+Text front end for .txt, .pdf and .epub inputs.
+Paragraphs (TXT), pages (PDF) or spine documents (EPUB) are pulled one at a
+time from a generator and tokenized straight into semantic units, so no ASR
+model is loaded and a long book is never held in memory as a whole. Units are
+timed at a steady reading pace; the renderer lays the English parts out over
+silence instead of source audio.
+"""
+
+import os
+import re
+
+TEXT_EXTENSIONS = (".txt", ".pdf", ".epub")
+WORDS_PER_MINUTE = float(os.getenv("ELA_TEXT_WORDS_PER_MINUTE", "150"))
+SENTENCE_PAUSE = 0.4
+# TXT files without blank lines are still read in blocks of about this many characters.
+MAX_BLOCK_CHARS = 1 << 16
+# Output audio format of text inputs, matching the TTS clips.
+TEXT_FRAME_RATE = 24000
+TEXT_CHANNELS = 1
+
+_HYPHEN_BREAK = re.compile(r"(\w)-\s*\n\s*(\w)")
+
+
+def is_text_input(path):
+    return path.lower().endswith(TEXT_EXTENSIONS)
+
+
+def iter_txt(path, progress=None):
+    """Blank-line separated paragraphs of a UTF-8 text file, read line by line."""
+    total = os.path.getsize(path) or 1
+    block, size, done = [], 0, 0
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        for line in f:
+            done += len(line)
+            if line.strip():
+                block.append(line)
+                size += len(line)
+                if size < MAX_BLOCK_CHARS:
+                    continue
+            if block:
+                yield "".join(block)
+                block, size = [], 0
+                if progress:
+                    progress(min(int(done / total * 100), 100))
+    if block:
+        yield "".join(block)
+    if progress:
+        progress(100)
+
+
+def iter_pdf(path, progress=None):
+    """Text of every PDF page; only the current page is loaded."""
+    import fitz
+    with fitz.open(path) as doc:
+        n = doc.page_count
+        for i in range(n):
+            yield doc.load_page(i).get_text("text")
+            if progress:
+                progress(int((i + 1) / n * 100))
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def epub_spine(zf):
+    """Archive member names of an EPUB's documents in reading order."""
+    import posixpath
+    import xml.etree.ElementTree as ET
+    from urllib.parse import unquote
+    container = ET.fromstring(zf.read("META-INF/container.xml"))
+    opf = next(e.get("full-path") for e in container.iter() if _local_name(e.tag) == "rootfile")
+    package = ET.fromstring(zf.read(opf))
+    base = posixpath.dirname(opf)
+    manifest = {e.get("id"): e.get("href") for e in package.iter() if _local_name(e.tag) == "item"}
+    return [
+        posixpath.normpath(posixpath.join(base, unquote(manifest[e.get("idref")])))
+        for e in package.iter()
+        if _local_name(e.tag) == "itemref" and e.get("idref") in manifest
+    ]
+
+
+def iter_epub(path, progress=None):
+    """Text of every spine document, read from the archive one at a time."""
+    import zipfile
+    from bs4 import BeautifulSoup
+    with zipfile.ZipFile(path) as zf:
+        spine = epub_spine(zf)
+        for i, name in enumerate(spine, start=1):
+            soup = BeautifulSoup(zf.read(name), "html.parser")
+            for tag in soup(["script", "style"]):
+                tag.decompose()
+            yield soup.get_text(" ")
+            if progress:
+                progress(int(i / len(spine) * 100))
+
+
+def iter_blocks(path, progress=None):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        return iter_pdf(path, progress)
+    if ext == ".epub":
+        return iter_epub(path, progress)
+    return iter_txt(path, progress)
+
+
+def build_text_units(blocks):
+    """Tokenize text blocks into a UnitArray timed at WORDS_PER_MINUTE.
+
+    Words and numbers take one reading slot each, symbols none; sentence-final
+    punctuation adds SENTENCE_PAUSE. Blocks are consumed as they arrive.
+    """
+    from core.units import UnitBuilder, tokenize
+    units, uid, t = UnitBuilder(), 1, 0.0
+    slot = 60.0 / WORDS_PER_MINUTE
+    for block in blocks:
+        # Words split across lines in PDFs and hard-wrapped text.
+        for utype, tok in tokenize(_HYPHEN_BREAK.sub(r"\1\2", block)):
+            if utype == "symbol":
+                units.add(uid, utype, tok, t, t)
+                if tok in (".", "?", "!"):
+                    t += SENTENCE_PAUSE
+            else:
+                units.add(uid, utype, tok, t, t + slot)
+                t += slot
+            uid += 1
+    return units.build()
+
+
+def silent_source(seconds, frame_rate=TEXT_FRAME_RATE, channels=TEXT_CHANNELS):
+    """Read-only int16 (frames, channels) silence; zero-strided, so it takes no memory at any length."""
+    import numpy as np
+    frames = int(seconds * frame_rate) + 1
+    return np.broadcast_to(np.zeros((1, channels), dtype=np.int16), (frames, channels))
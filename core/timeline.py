@@ -0,0 +1,243 @@
+# ========== core/timeline.py ==========
+"""
+Two-pass audio timeline assembler for generate_outputs.
+The first pass lays out every English slice, Russian clip and pause and computes
+the subtitle events; the second pass fills one preallocated int16 buffer with
+vectorized fades. Positions follow pydub's millisecond arithmetic so subtitle
+timings match the previous `out_audio += ...` assembly.
+"""
+
+import numpy as np
+
+SAMPLE_WIDTH = 2
+# pydub generates AudioSegment.silent() at 11025 Hz and resamples it on concatenation.
+_SILENCE_RATE = 11025
+_MIN_GAIN = 10 ** (-120 / 20)
+
+
+def segment_to_array(seg, channels, frame_rate=None):
+    """Decode a pydub AudioSegment into an int16 (frames, channels) array."""
+    seg = seg.set_channels(channels).set_sample_width(SAMPLE_WIDTH)
+    if frame_rate:
+        seg = seg.set_frame_rate(frame_rate)
+    return np.frombuffer(seg.raw_data, dtype=np.int16).reshape(-1, channels)
+
+
+def _fade(idx, gain, frame_rate, start_ms, end_ms, fade_in):
+    """Apply pydub's AudioSegment.fade() to a segment described by source frame indices.
+
+    idx holds source frame indices (-1 for padded silence) and gain the per-frame
+    factor. The result reproduces fade()'s layout exactly: the part before the
+    fade, one frame per fractional fade step (frames past the end are dropped),
+    then the part after it, each slice ending where pydub's ms slicing ends.
+    """
+    m = len(idx)
+    if not m:
+        return idx, gain
+    r = frame_rate / 1000.0
+    length_ms = round(1000 * (m / frame_rate))
+
+    def ms_slice(a_ms, b_ms):
+        a = int(min(a_ms, length_ms) * r)
+        b = int(min(b_ms, length_ms) * r)
+        return np.arange(a, max(a, b), dtype=np.int64)
+
+    start_frame = max(start_ms, 0) * r
+    fade_frames = end_ms * r - start_frame
+    before = ms_slice(0, max(start_ms, 0))
+    faded = (start_frame + np.arange(int(fade_frames))).astype(np.int64)
+    faded = faded[faded < m]
+    after = ms_slice(end_ms, length_ms)
+
+    ramp = np.arange(len(faded), dtype=np.float64) * ((1.0 - _MIN_GAIN) / fade_frames)
+    ramp = _MIN_GAIN + ramp if fade_in else 1.0 - ramp
+
+    pos = np.concatenate([before, faded, after])
+    valid = pos < m
+    new_idx = np.full(len(pos), -1, dtype=np.int64)
+    new_idx[valid] = idx[pos[valid]]
+    new_gain = np.zeros(len(pos), dtype=np.float64)
+    new_gain[valid] = gain[pos[valid]]
+    new_gain[len(before):len(before) + len(faded)] *= ramp
+    return new_idx, new_gain
+
+
+def fade_plan(n, frame_rate, fade_in_ms=0, fade_out_ms=0):
+    """Frame indices and gains of `seg.fade_in(fade_in_ms).fade_out(fade_out_ms)` for an n-frame seg."""
+    idx = np.arange(n, dtype=np.int64)
+    gain = np.ones(n, dtype=np.float64)
+    if fade_in_ms:
+        idx, gain = _fade(idx, gain, frame_rate, 0, fade_in_ms, True)
+    if fade_out_ms:
+        length_ms = round(1000 * (len(idx) / frame_rate))
+        idx, gain = _fade(idx, gain, frame_rate, length_ms - fade_out_ms, length_ms, False)
+    return idx, gain
+
+
+def _ratecv_frames(n, in_rate, out_rate):
+    """Output length of audioop.ratecv, which pydub uses for every rate conversion."""
+    return (n - 1) * out_rate // in_rate + 1 if n else 0
+
+
+def _resample(samples, n_out):
+    """Linear resampling of an int16 (frames, channels) array to exactly n_out frames."""
+    n_in = len(samples)
+    if n_in == n_out:
+        return samples
+    if not n_in or not n_out:
+        return np.zeros((n_out, samples.shape[1]), dtype=np.int16)
+    pos = np.linspace(0, n_in - 1, n_out)
+    out = np.empty((n_out, samples.shape[1]), dtype=np.int16)
+    for c in range(samples.shape[1]):
+        out[:, c] = np.interp(pos, np.arange(n_in), samples[:, c])
+    return out
+
+
+def _faded(samples, frame_rate, fade_in_ms, fade_out_ms):
+    if not (fade_in_ms or fade_out_ms):
+        return samples
+    idx, gain = fade_plan(len(samples), frame_rate, fade_in_ms, fade_out_ms)
+    out = np.zeros((len(idx), samples.shape[1]), dtype=np.int16)
+    valid = idx >= 0
+    out[valid] = samples[idx[valid]]
+    # audioop.mul, which pydub uses for gains, floors the scaled samples.
+    scaled = valid & (gain != 1.0)
+    out[scaled] = np.floor(samples[idx[scaled]] * gain[scaled, None])
+    return out
+
+
+class Timeline:
+    """Layout of the output audio, rendered into one buffer at the end.
+
+    Like pydub concatenation, appending audio with a higher frame rate than the
+    timeline converts everything assembled so far to that rate, and lower-rate
+    pieces are converted up; lengths follow audioop.ratecv exactly.
+    """
+
+    def __init__(self, frame_rate, channels):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.total_frames = 0
+        self._ops = []
+
+    def ms(self, frames=None, frame_rate=None):
+        """Length in milliseconds the way pydub's len() reports it."""
+        frames = self.total_frames if frames is None else frames
+        return round(1000 * (frames / (frame_rate or self.frame_rate)))
+
+    def _sync(self, rate):
+        if rate > self.frame_rate:
+            converted = _ratecv_frames(self.total_frames, self.frame_rate, rate)
+            self._ops.append(("resample", self.total_frames, converted))
+            self.frame_rate, self.total_frames = rate, converted
+
+    def add_array(self, samples, fade_in_ms=0, fade_out_ms=0, frame_rate=None):
+        """Append audio with pydub-compatible edge fades.
+
+        Returns the piece's length in ms at its own rate, as len() of the pydub segment.
+        """
+        rate = frame_rate or self.frame_rate
+        self._sync(rate)
+        length = len(samples)
+        if fade_in_ms or fade_out_ms:
+            # Only the length is needed now; the fade itself is applied in render().
+            length = len(fade_plan(len(samples), rate, fade_in_ms, fade_out_ms)[0])
+        native_ms = self.ms(length, rate)
+        if rate != self.frame_rate:
+            length = _ratecv_frames(length, rate, self.frame_rate)
+        if length:
+            self._ops.append(("piece", self.total_frames, length, samples, rate, fade_in_ms, fade_out_ms))
+            self.total_frames += length
+        return native_ms
+
+    def add_silence(self, ms):
+        frames = int(_SILENCE_RATE * (ms / 1000.0))
+        self._sync(_SILENCE_RATE)
+        self.total_frames += _ratecv_frames(frames, _SILENCE_RATE, self.frame_rate)
+        return self.ms(frames, _SILENCE_RATE)
+
+    def render(self):
+        # Buffer sizes between rate changes; without a rate change this is a single buffer.
+        ends = [op[1] for op in self._ops if op[0] == "resample"] + [self.total_frames]
+        out = np.zeros((ends.pop(0), self.channels), dtype=np.int16)
+        for op in self._ops:
+            if op[0] == "resample":
+                _, old_total, new_total = op
+                converted = _resample(out[:old_total], new_total)
+                out = np.zeros((ends.pop(0), self.channels), dtype=np.int16)
+                out[:new_total] = converted
+                continue
+            _, offset, length, samples, rate, fade_in_ms, fade_out_ms = op
+            piece = _faded(samples, rate, fade_in_ms, fade_out_ms)
+            out[offset:offset + length] = _resample(piece, length) if len(piece) != length else piece
+        return out
+
+
+def build_timeline(sentences, source, frame_rate, channels, subtitle_mode, load_clip):
+    """Lay out the bilingual audio for `sentences`.
+
+    source     int16 (frames, channels) array of the original audio
+    load_clip  path -> (int16 array of the faded-in Russian clip with the source's
+               channel count, clip length in ms, clip frame rate)
+    Returns (timeline, events) where events are (start_ms, end_ms, text, style).
+    """
+    tl = Timeline(frame_rate, channels)
+    events = []
+    source_ms = round(1000 * (len(source) / frame_rate))
+
+    def source_slice(st, et):
+        st, et = min(st, source_ms), min(et, source_ms)
+        a, b = int(st * (frame_rate / 1000.0)), int(et * (frame_rate / 1000.0))
+        samples = source[a:max(a, b)]
+        if len(samples) < b - a:
+            # pydub pads slices that end a fraction of a millisecond past the data.
+            pad = np.zeros((b - a - len(samples), source.shape[1]), dtype=source.dtype)
+            samples = np.concatenate([samples, pad])
+        return samples
+
+    def ru_clip(s):
+        return load_clip(s["audio_ru_path"]) if s["audio_ru_path"] else (None, 0, None)
+
+    for idx, s in enumerate(sentences, start=1):
+        st = int(s["start"] * 1000)
+        et = int(s["end"] * 1000)
+        pos_en = tl.ms()
+        dur_e = tl.add_array(source_slice(st, et), fade_in_ms=1, fade_out_ms=1, frame_rate=frame_rate)
+
+        if subtitle_mode in ("0", "1"):
+            events.append((pos_en, pos_en + dur_e, s["text_eng"], "Top"))
+
+        if subtitle_mode in ("1", "2", "3", "4"):
+            tl.add_silence(10)
+
+            if subtitle_mode == "1":
+                pos_ru = tl.ms()
+                clip, dur_r, clip_rate = ru_clip(s)
+                if clip is not None:
+                    tl.add_array(clip, frame_rate=clip_rate)
+                events.append((pos_ru, pos_ru + dur_r, s["text_ru"], "Top"))
+
+            elif subtitle_mode == "4":
+                clip, _, clip_rate = ru_clip(s)
+                if clip is not None:
+                    tl.add_array(clip, frame_rate=clip_rate)
+                events.append((pos_en, tl.ms(), s["text_ru"], "Top"))
+
+            elif subtitle_mode == "2":
+                tl.add_silence(10)
+                pos_ru = tl.ms()
+                clip, dur_r, clip_rate = ru_clip(s)
+                if clip is not None:
+                    tl.add_array(clip, frame_rate=clip_rate)
+                end_all = pos_ru + dur_r
+                events.append((pos_en, end_all, s["text_eng"], "Top"))
+                events.append((pos_en, end_all, s["text_ru"], "Bottom"))
+
+            elif subtitle_mode == "3":
+                events.append((pos_en, pos_en + dur_e, s["text_ru"], "Top"))
+
+        if idx < len(sentences):
+            gap = int((sentences[idx]["start"] - s["end"]) * 1000)
+            tl.add_silence(max(gap // 3, 10))
+
+    return tl, events
@@ -0,0 +1,127 @@
+# ========== core/tracing.py ==========
+"""
+Lightweight tracing for pipeline runs.
+A Tracer collects spans (stages, translation batches, TTS requests, sentences),
+counters (cache hits, API calls, bytes) and log messages from any thread, and
+exports them as a Chrome trace (chrome://tracing, Perfetto) or a JSON summary.
+ProgressCoalescer limits how often progress reaches the UI.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+UI_UPDATES_PER_SECOND = 10
+
+
+class Tracer:
+    def __init__(self, name="pipeline", echo=True):
+        self.name = name
+        self.echo = echo
+        self.counters = {}
+        self._events = []
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _us(self, t):
+        return round((t - self._t0) * 1e6)
+
+    def now(self):
+        return time.perf_counter()
+
+    def add_span(self, name, start, end, cat="stage", **args):
+        """Record a finished span; start and end are Tracer.now() values."""
+        event = {"name": name, "cat": cat, "ph": "X", "ts": self._us(start), "dur": self._us(end) - self._us(start),
+                 "pid": self._pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        start = self.now()
+        try:
+            yield args
+        finally:
+            self.add_span(name, start, self.now(), cat, **args)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def log(self, message):
+        """Print a status message and keep it in the trace as an instant event."""
+        with self._lock:
+            self._events.append({"name": message, "cat": "log", "ph": "i", "s": "t", "ts": self._us(self.now()),
+                                 "pid": self._pid, "tid": threading.get_ident()})
+        if self.echo:
+            print(message)
+
+    def span_seconds(self, cat="stage"):
+        """Total seconds per span name in `cat`."""
+        totals = {}
+        with self._lock:
+            for e in self._events:
+                if e["ph"] == "X" and e["cat"] == cat:
+                    totals[e["name"]] = totals.get(e["name"], 0) + e["dur"]
+        return {name: round(us / 1e6, 3) for name, us in totals.items()}
+
+    def summary(self):
+        return {"stages": self.span_seconds("stage"), "counters": dict(self.counters)}
+
+    def chrome_trace(self):
+        with self._lock:
+            events = list(self._events)
+        names = {e["tid"] for e in events}
+        meta = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                 "args": {"name": "main" if tid == threading.main_thread().ident else f"thread-{tid}"}}
+                for tid in names]
+        return {
+            "traceEvents": meta + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"name": self.name, "counters": dict(self.counters)},
+        }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        return path
+
+
+class ProgressCoalescer:
+    """Wraps a progress callback(step, value) so it fires at most `rate` times per second.
+
+    Only the latest value of every step is kept; 0 and 100 are always delivered so
+    the UI never misses the start or end of a step.
+    """
+
+    def __init__(self, callback, rate=UI_UPDATES_PER_SECOND):
+        self.callback = callback
+        self.interval = 1.0 / rate
+        self._pending = {}
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, step, value):
+        with self._lock:
+            self._pending[step] = value
+            now = time.monotonic()
+            if value not in (0, 100) and now - self._last < self.interval:
+                return
+            self._last = now
+            self._deliver()
+
+    def flush(self):
+        with self._lock:
+            self._deliver()
+
+    def _deliver(self):
+        # Called under the lock so updates from different threads arrive in order.
+        pending, self._pending = self._pending, {}
+        for step, value in pending.items():
+            self.callback(step, value)
+
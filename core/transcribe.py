@@ -0,0 +1,141 @@
+# ========== core/transcribe.py ==========
+"""
+Chunked Whisper transcription for long media.
+The input is decoded once to 16 kHz mono PCM, split at low-energy points near
+fixed chunk lengths, and the chunks are transcribed in order, either in this
+process or in a pool of worker processes that keep their model loaded.
+Segments are yielded chunk by chunk with timestamps shifted to the whole file.
+The pool is off by default (ELA_WHISPER_WORKERS=1, or --whisper-workers in
+core.cli): every worker loads its own copy of the model, several GB of RAM for
+"medium", so it is only worth enabling on machines with memory to spare.
+"""
+
+import os
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = int(os.getenv("ELA_WHISPER_CHUNK_SECONDS", "300"))
+SPLIT_SEARCH_SECONDS = 20
+ENERGY_FRAME_SECONDS = 0.03
+WORKERS = int(os.getenv("ELA_WHISPER_WORKERS", "1"))
+
+_pool = None
+_pool_key = None
+
+
+def decode_to_pcm(audio_path, pcm_path, source=None):
+    """Decode any media file to raw float32 16 kHz mono PCM on disk.
+
+    With `source` (a core.source_audio.SourceAudio of the same file) its cached
+    PCM is resampled instead of decoding the original container again.
+    """
+    inputs = source.input_args() if source is not None else ["-i", audio_path]
+    cmd = [
+        "ffmpeg", "-nostdin", "-y", "-loglevel", "error", *inputs,
+        "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), pcm_path,
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return pcm_path
+
+
+def open_pcm(pcm_path):
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(pcm_path, dtype=np.float32, mode="r")
+
+
+def find_chunks(audio, chunk_seconds=CHUNK_SECONDS, search_seconds=SPLIT_SEARCH_SECONDS):
+    """(start, end) sample ranges; each cut is placed at the quietest 30 ms frame near the target."""
+    n = len(audio)
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    search = int(search_seconds * SAMPLE_RATE)
+    frame = int(ENERGY_FRAME_SECONDS * SAMPLE_RATE)
+    cuts = [0]
+    while n - cuts[-1] > chunk + search:
+        center = cuts[-1] + chunk
+        lo = center - search
+        window = np.asarray(audio[lo:center + search], dtype=np.float32)
+        frames = window[:len(window) // frame * frame].reshape(-1, frame)
+        energy = np.square(frames).mean(axis=1)
+        cuts.append(lo + int(energy.argmin()) * frame + frame // 2)
+    cuts.append(n)
+    return [(a, b) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+
+
+def _transcribe_chunk(model_name, pcm_path, start, end):
+    from core.models import registry
+    model = registry.whisper(model_name)
+    audio = np.array(open_pcm(pcm_path)[start:end], dtype=np.float32)
+    result = model.transcribe(audio, language="en", word_timestamps=True, verbose=None)
+    offset = start / SAMPLE_RATE
+    segments = []
+    for seg in result["segments"]:
+        segments.append({
+            "start": seg["start"] + offset,
+            "end": seg["end"] + offset,
+            "text": seg["text"],
+            "words": [
+                {"word": w["word"], "start": w["start"] + offset, "end": w["end"] + offset}
+                for w in seg.get("words", [])
+            ],
+        })
+    return segments
+
+
+def _warm_worker(model_name):
+    from core.models import registry
+    registry.whisper(model_name)
+
+
+def _get_pool(model_name, workers):
+    """Worker pool reused across files so every worker loads its model only once."""
+    global _pool, _pool_key
+    if _pool is not None and _pool_key != (model_name, workers):
+        _pool.shutdown()
+        _pool = None
+    if _pool is None:
+        ctx = multiprocessing.get_context("spawn")
+        _pool = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_warm_worker, initargs=(model_name,))
+        _pool_key = (model_name, workers)
+    return _pool
+
+
+def transcribe_segments(audio_path, tmpdir, model_name="medium", workers=WORKERS, progress=None, source=None):
+    """Yield Whisper segments for the whole file in order, chunk by chunk.
+
+    progress(percent) is called after every finished chunk, weighted by audio length.
+    `source` is the file's cached decode, if there is one (see decode_to_pcm).
+    """
+    pcm_path = decode_to_pcm(audio_path, os.path.join(tmpdir, "asr_16k.f32"), source)
+    chunks = find_chunks(open_pcm(pcm_path))
+    total = sum(b - a for a, b in chunks) or 1
+    done = 0
+    if workers > 1 and len(chunks) > 1:
+        pool = _get_pool(model_name, workers)
+        results = (f.result() for f in [pool.submit(_transcribe_chunk, model_name, pcm_path, a, b) for a, b in chunks])
+    else:
+        results = (_transcribe_chunk(model_name, pcm_path, a, b) for a, b in chunks)
+    for (a, b), segments in zip(chunks, results):
+        yield from segments
+        done += b - a
+        if progress:
+            progress(int(done / total * 100))
+
+
+def build_semantic_units(segments):
+    """Flatten Whisper words into a UnitArray of numbered word/number/symbol units with source timestamps."""
+    from core.units import UnitBuilder, tokenize
+    units, uid = UnitBuilder(), 1
+    for seg in segments:
+        for w in seg["words"]:
+            raw = w["word"].strip()
+            if not raw:
+                continue
+            for utype, tok in tokenize(raw):
+                units.add(uid, utype, tok, w["start"], w["end"])
+                uid += 1
+    return units.build()
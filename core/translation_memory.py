@@ -0,0 +1,111 @@
+# ========== core/translation_memory.py ==========
+"""
+Sentence-level translation memory stored in cache.db.
+Entries are keyed by (provider, model, normalized English sentence) and shared
+across files and runs, so repeated lines are never sent to a translator twice.
+"""
+
+import re
+import threading
+import unicodedata
+
+# SQLite's default limit on bound parameters in one statement is 999.
+_LOOKUP_CHUNK = 900
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TranslationMemory:
+    """Lookups may run on worker threads; writes are queued and applied by flush()
+    on the thread that owns the connection."""
+
+    def __init__(self, conn, provider: str, model: str = ""):
+        self.conn = conn
+        self.provider = provider
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._prefetched = {}
+        self._looked_up = set()
+        self._pending_puts = {}
+        self._pending_hits = []
+        self._lock = threading.Lock()
+
+    def lookup_many(self, texts):
+        """Bulk lookup; returns ({normalized text: translation}, normalized keys looked up)."""
+        keys = list({normalize(t) for t in texts if t and t.strip()})
+        found = {}
+        cur = self.conn.cursor()
+        for i in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[i:i + _LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            cur.execute(
+                f"SELECT source, target FROM translation_memory "
+                f"WHERE provider = ? AND model = ? AND source IN ({marks})",
+                (self.provider, self.model, *chunk)
+            )
+            found.update(cur.fetchall())
+        cur.close()
+        return found, keys
+
+    def prefetch(self, texts):
+        """Load every known translation for `texts` in one query before translating.
+
+        Afterwards get() answers for these texts without touching the database.
+        """
+        found, keys = self.lookup_many(texts)
+        with self._lock:
+            self._prefetched.update(found)
+            self._looked_up.update(keys)
+
+    def get(self, text: str):
+        key = normalize(text)
+        with self._lock:
+            target = self._prefetched.get(key)
+            known = key in self._looked_up or target is not None
+        if not known:
+            row = self.conn.execute(
+                "SELECT target FROM translation_memory WHERE provider = ? AND model = ? AND source = ?",
+                (self.provider, self.model, key)
+            ).fetchone()
+            target = row[0] if row else None
+        with self._lock:
+            if target is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._pending_hits.append(key)
+        return target
+
+    def put(self, text: str, target: str):
+        key = normalize(text)
+        with self._lock:
+            self._prefetched[key] = target
+            self._pending_puts[key] = target
+
+    def flush(self):
+        """Write queued translations and hit counts; call from the connection's thread."""
+        with self._lock:
+            puts, self._pending_puts = self._pending_puts, {}
+            hits, self._pending_hits = self._pending_hits, []
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO translation_memory (provider, model, source, target) VALUES (?, ?, ?, ?)",
+            [(self.provider, self.model, k, v) for k, v in puts.items()]
+        )
+        self.conn.executemany(
+            "UPDATE translation_memory SET hits = hits + 1 WHERE provider = ? AND model = ? AND source = ?",
+            [(self.provider, self.model, k) for k in hits]
+        )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,194 @@
+# ========== core/translators.py ==========
+"""
+Pluggable translation backends with a common batch interface.
+Every provider implements translate_batch(); sentences are packed into batches
+by count and estimated token size, and results are mapped back to sentence ids.
+"""
+
+import os
+import re
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly 4 characters per token for English; good enough for batch sizing.
+    return len(text) // 4 + 1
+
+
+class Translator:
+    provider = ""
+    model = ""
+    max_batch_items = 32
+    max_batch_tokens = 2000
+
+    def translate(self, text: str) -> str:
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts):
+        raise NotImplementedError
+
+
+class GPTTranslator(Translator):
+    provider = "gpt"
+    max_batch_items = 40
+    max_batch_tokens = 1200
+
+    def __init__(self, model="gpt-3.5-turbo"):
+        from openai import OpenAI
+        self.model = model
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def _complete(self, prompt):
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3
+        )
+        return resp.choices[0].message.content.strip()
+
+    def translate(self, text: str) -> str:
+        return self._complete(f"Переведи литературно на русский: {text}")
+
+    def translate_batch(self, texts):
+        if len(texts) == 1:
+            return [self.translate(texts[0])]
+        numbered = "\n".join(f"{i}. {t}" for i, t in enumerate(texts, start=1))
+        reply = self._complete(
+            "Переведи литературно на русский каждое предложение. "
+            "Сохрани нумерацию, по одному предложению на строку, без комментариев:\n" + numbered
+        )
+        lines = {}
+        for line in reply.splitlines():
+            m = re.match(r"\s*(\d+)[.)]\s*(.*)", line)
+            if m:
+                lines[int(m.group(1))] = m.group(2).strip()
+        if sorted(lines) != list(range(1, len(texts) + 1)):
+            # The model merged or dropped lines; fall back to one request per sentence.
+            return [self.translate(t) for t in texts]
+        return [lines[i] for i in range(1, len(texts) + 1)]
+
+
+class DeepLTranslator(Translator):
+    provider = "deepl"
+    max_batch_items = 50
+    max_batch_tokens = 30000
+
+    def __init__(self):
+        import deepl
+        self.client = deepl.Translator(os.getenv("DEEPL_AUTH_KEY"))
+
+    def translate_batch(self, texts):
+        results = self.client.translate_text(list(texts), target_lang="RU")
+        return [r.text for r in results]
+
+
+class LaraTranslator(Translator):
+    provider = "lara"
+    max_batch_items = 50
+    max_batch_tokens = 2500
+
+    def __init__(self):
+        from lara_sdk import Credentials, Translator as LaraClient
+        creds = Credentials(os.getenv("LARA_API_ID"), os.getenv("LARA_API_SECRET"))
+        self.client = LaraClient(creds)
+
+    def translate_batch(self, texts):
+        res = self.client.translate(list(texts), source="en-US", target="ru-RU")
+        out = res.translation
+        if isinstance(out, str):
+            out = [out] if len(texts) == 1 else None
+        if out is None or len(out) != len(texts):
+            return [self.client.translate(t, source="en-US", target="ru-RU").translation for t in texts]
+        return [getattr(t, "text", t) for t in out]
+
+
+class HFTranslator(Translator):
+    provider = "hf"
+    max_batch_items = 16
+    max_batch_tokens = 2000
+
+    def __init__(self, model="Helsinki-NLP/opus-mt-en-ru"):
+        from core.models import registry
+        self.model = model
+        self.pipe = registry.hf_translator(model)
+
+    def translate_batch(self, texts):
+        out = self.pipe(list(texts), max_length=512, batch_size=len(texts))
+        return [o["translation_text"] for o in out]
+
+
+class NoTranslator(Translator):
+    provider = "original"
+
+    def translate_batch(self, texts):
+        return ["" for _ in texts]
+
+
+_TRANSLATORS = {
+    "g": GPTTranslator,
+    "d": DeepLTranslator,
+    "l": LaraTranslator,
+    "h": HFTranslator,
+    "n": NoTranslator,
+}
+
+
+def get_translator(code: str) -> Translator:
+    try:
+        return _TRANSLATORS[code]()
+    except KeyError:
+        raise RuntimeError("Unsupported translation mode.") from None
+
+
+def pack_batches(items, max_items, max_tokens):
+    """Split (id, text) items into consecutive batches bounded by count and estimated tokens."""
+    batch, tokens = [], 0
+    for item in items:
+        cost = estimate_tokens(item[1])
+        if batch and (len(batch) >= max_items or tokens + cost > max_tokens):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(item)
+        tokens += cost
+    if batch:
+        yield batch
+
+
+def translate_sentences(translator, items, memory=None, progress=None, tracer=None):
+    """Translate (id, text) items; returns {id: translation}.
+
+    Known sentences are served from the translation memory, identical texts are
+    sent once, and the rest goes to the provider in packed batches. Provider
+    requests are recorded as spans and counters on `tracer` when given.
+    """
+    items = list(items)
+    result = {}
+    todo = {}
+    for sid, text in items:
+        cached = memory.get(text) if memory is not None else None
+        if cached is not None:
+            result[sid] = cached
+        else:
+            todo.setdefault(text, []).append(sid)
+
+    done = len(result)
+    if progress and items:
+        progress(done, len(items))
+    pending = [(sids, text) for text, sids in todo.items()]
+    for batch in pack_batches(pending, translator.max_batch_items, translator.max_batch_tokens):
+        texts = [text for _, text in batch]
+        if tracer is None:
+            translations = translator.translate_batch(texts)
+        else:
+            tracer.count("translator.requests")
+            tracer.count("translator.chars", sum(len(t) for t in texts))
+            with tracer.span("translator.request", cat="api", provider=translator.provider, sentences=len(texts)):
+                translations = translator.translate_batch(texts)
+        for (sids, text), ru in zip(batch, translations):
+            if memory is not None:
+                memory.put(text, ru)
+            for sid in sids:
+                result[sid] = ru
+            done += len(sids)
+        if progress:
+            progress(done, len(items))
+    return result
@@ -0,0 +1,109 @@
+# ========== core/tts.py ==========
+"""
+Batch edge-tts synthesis on one long-lived asyncio event loop.
+A bounded number of requests is kept in flight and failed requests are retried
+with jittered exponential backoff; results are returned in submission order.
+"""
+
+import os
+import random
+import asyncio
+import threading
+
+from core.audio_store import TTS_SETTINGS
+
+MAX_IN_FLIGHT = int(os.getenv("ELA_TTS_CONCURRENCY", "8"))
+MIN_CLIP_BYTES = 1024
+
+
+class TTSEngine:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, retries=3, backoff_base=0.5, backoff_cap=8.0):
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.max_in_flight)
+                started.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="tts-loop", daemon=True)
+            self._thread.start()
+            started.wait()
+            self._loop = loop
+            return loop
+
+    async def _save_once(self, text, voice, path):
+        import edge_tts
+        await edge_tts.Communicate(
+            text, voice,
+            rate=TTS_SETTINGS["rate"], volume=TTS_SETTINGS["volume"], pitch=TTS_SETTINGS["pitch"]
+        ).save(path)
+        return os.path.exists(path) and os.path.getsize(path) > MIN_CLIP_BYTES
+
+    async def _synthesize(self, text, voice, path):
+        for attempt in range(1, self.retries + 1):
+            async with self._semaphore:
+                try:
+                    if await self._save_once(text, voice, path):
+                        return True
+                except Exception as e:
+                    print(f"TTS retry {attempt} failed: {e}")
+            if attempt < self.retries:
+                delay = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        return False
+
+    def submit(self, text, voice, path):
+        """Schedule one synthesis; returns a concurrent.futures.Future resolving to bool."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._synthesize(text, voice, path), loop)
+
+    def synthesize(self, text, voice, path):
+        return self.submit(text, voice, path).result()
+
+    def synthesize_batch(self, items, progress=None):
+        """Synthesize (text, voice, path) items concurrently; returns success flags in input order."""
+        futures = [self.submit(text, voice, path) for text, voice, path in items]
+        results = []
+        for i, fut in enumerate(futures, start=1):
+            results.append(fut.result())
+            if progress:
+                progress(i, len(futures))
+        return results
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide TTS engine shared by all pipeline runs."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TTSEngine()
+        return _engine
@@ -2,411 +2,591 @@
 """
 Main pipeline logic for processing the input (transcription, translation, TTS, and output generation).
 Uses SQLite (cache.db) to cache transcripts and translations.
+Audio, subtitle and model libraries are imported by the stage that needs them,
+so importing this module stays cheap.
 """
 
 import os
-import json
 import time
 import re
-import asyncio
 import shutil
-import hashlib
-import subprocess
-import sqlite3
-
-import whisper
-import spacy
-import edge_tts
-import deepl
-import pysubs2
-from pysubs2 import Alignment
-from pydub import AudioSegment
-from PIL import Image
-from tqdm import tqdm
-from transformers import pipeline as hf_pipeline
-from openai import OpenAI, OpenAIError
-from lara_sdk import Credentials, Translator as LaraTranslator
+
+from core import cache_admin, checkpoints, revisions
+from core.audio_store import AudioStore
+from core.cache_engine import decode_blob, encode_blob, encode_payload
+from core.db_utils import MEDIA_CACHE_DIR, cache_pool
+from core.hashing import file_data_hash, settings_hash
+from core.outputs import (DEFAULT_SUFFIX, TRANSLATOR_SUFFIXES, OutputWriter, configured_artifacts,
+                          parse_artifacts, parse_modes, serialize, translation_mode)
+from core.source_audio import SourceCache, probe
+from core.stages import run_translation_stages
+from core.translation_memory import TranslationMemory
+from core.translators import get_translator, translate_sentences
+from core.tracing import ProgressCoalescer, Tracer
+from core.tts import get_engine
+
+# Seconds between commits of finished sentences during translation.
+CHECKPOINT_INTERVAL = 2.0
 
 
 def run_pipeline_main(audio_path, translator_choice, voice_choice, subtitle_mode,
-                      tmpdir, db_config, output_dir, ui_callback=None):
+                      tmpdir, db_config, output_dir, ui_callback=None, tracer=None, artifacts=None,
+                      edits=None):
+    """Run the whole pipeline for one file.
+
+    .txt, .pdf and .epub inputs are read by core.text_ingest instead of Whisper.
+    `subtitle_mode` may name several modes ("0,1" or an iterable): they share one
+    translation, the decoded source and the Russian clips, and each gets its own
+    srt/mp3/mp4.
+    `edits` is an edited sentence list for a file whose translation is cached (see
+    core.revisions): only changed sentences are translated and synthesized again,
+    and the result is stored as a new revision.
+    Spans, counters and messages go to `tracer` (a new Tracer if None). `artifacts`
+    selects the outputs to write (see core.outputs; default: the output_artifacts
+    setting). Returns a report with per-stage timings in seconds, the counters
+    (cache hits, API calls, bytes) and the output paths.
+    """
+    pool = cache_pool(db_config["database"])
+    # The connection goes back to the pool however the run ends; anything uncommitted is rolled back.
+    with pool.connection() as conn:
+        return _run_pipeline(pool, conn, audio_path, translator_choice, voice_choice, subtitle_mode,
+                             tmpdir, db_config, output_dir, ui_callback, tracer, artifacts, edits)
+
+
+def _run_pipeline(pool, conn, audio_path, translator_choice, voice_choice, subtitle_mode,
+                  tmpdir, db_config, output_dir, ui_callback, tracer, artifacts, edits):
+    from core.text_ingest import is_text_input
+    from core.units import UnitBuilder, load_units
+
     start_time = time.time()
+    text_input = is_text_input(audio_path)
+    tracer = tracer or Tracer(os.path.basename(audio_path))
+    if ui_callback:
+        # Stages report per sentence; the UI gets at most a few updates per second.
+        ui_callback = ProgressCoalescer(ui_callback)
+    stage_start = tracer.now()
+
+    def end_stage(name):
+        nonlocal stage_start
+        now = tracer.now()
+        tracer.add_span(name, stage_start, now)
+        stage_start = now
+
     if ui_callback:
         for i in range(1, 6):
             ui_callback(i, 0)
 
-    _suffix_map = {
-        "gpt": "gpt",
-        "deepl": "deepl",
-        "lara": "lara",
-        "hf": "hf",
-        "original": "en"
-    }
-    suffix = _suffix_map.get(translator_choice.lower(), "hf")
+    suffix = TRANSLATOR_SUFFIXES.get(translator_choice.lower(), DEFAULT_SUFFIX)
+    artifacts = configured_artifacts() if artifacts is None else parse_artifacts(artifacts)
+    modes = parse_modes(subtitle_mode)
+    # Translation, TTS and the cache key follow the mode that needs the most of them.
+    subtitle_mode = translation_mode(modes)
+    writer = OutputWriter(output_dir, audio_path, suffix, artifacts)
 
-    with open(audio_path, "rb") as f:
-        data = f.read()
-    data_hash = hashlib.sha256(data).hexdigest()
+    cur = conn.cursor()
+
+    progress = (lambda v: ui_callback(1, v)) if ui_callback else None
+    data_hash, from_index = file_data_hash(cur, audio_path, progress=progress)
+    conn.commit()
+    if from_index:
+        tracer.count("cache.fingerprint.hit")
+        tracer.log("File unchanged since last run, reusing its content hash.")
+    else:
+        tracer.count("hash.bytes", os.path.getsize(audio_path))
     if ui_callback:
         ui_callback(1, 100)
 
-    vc = voice_choice if voice_choice else ""
-    full_hash = hashlib.sha256(
-        data + translator_choice.encode() + subtitle_mode.encode() + vc.encode()
-    ).hexdigest()
-
-    db_path = db_config["database"]
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA foreign_keys = ON")
-    cur = conn.cursor()
+    full_hash = settings_hash(data_hash, translator_choice, subtitle_mode, voice_choice)
+    if edits is not None and cur.execute("SELECT 1 FROM translation_cache WHERE full_hash = ?",
+                                         (full_hash,)).fetchone() is None:
+        raise ValueError("No cached translation of this file with these settings to revise; process it first.")
+    checkpoints.start_job(cur, full_hash, data_hash, os.path.abspath(audio_path), output_dir,
+                          translator_choice, voice_choice, ",".join(modes))
+    conn.commit()
+    end_stage("hash")
 
     def select_semantic_units(cursor, data_hash):
         cursor.execute("SELECT semantic_units FROM file_cache WHERE data_hash = ?", (data_hash,))
         row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
+        cache_admin.record_lookup(cursor, "file_cache", data_hash, row is not None)
+        conn.commit()
+        tracer.count("cache.file_cache." + ("hit" if row else "miss"))
+        return load_units(decode_blob(row[0])) if row else None
 
-    def insert_semantic_units(cursor, data_hash, units_json):
-        cursor.execute("INSERT INTO file_cache (data_hash, semantic_units) VALUES (?, ?)", (data_hash, units_json))
+    def insert_semantic_units(cursor, data_hash, units):
+        """Store the transcript; returns the stored one, which another run may have written first."""
+        blob = encode_blob(units.to_columns())
+        cursor.execute(
+            "INSERT INTO file_cache (data_hash, semantic_units, bytes, last_access) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(data_hash) DO NOTHING",
+            (data_hash, blob, len(blob), time.time())
+        )
+        if cursor.rowcount == 0:
+            tracer.log("Transcript was cached by a concurrent run, using that one.")
+            cursor.execute("SELECT semantic_units FROM file_cache WHERE data_hash = ?", (data_hash,))
+            return load_units(decode_blob(cursor.fetchone()[0]))
+        tracer.count("cache.bytes_written", len(blob))
+        return units
 
     def select_bilingual_objects(cursor, full_hash):
         cursor.execute("SELECT bilingual_objects FROM translation_cache WHERE full_hash = ?", (full_hash,))
         row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
-
-    def insert_bilingual_objects(cursor, full_hash, data_hash, bo_json):
+        cache_admin.record_lookup(cursor, "translation_cache", full_hash, row is not None)
+        conn.commit()
+        tracer.count("cache.translation_cache." + ("hit" if row else "miss"))
+        if row is None:
+            return None
+        sentences, _ = revisions.apply_all(cursor, full_hash, decode_blob(row[0]))
+        return sentences
+
+    def insert_bilingual_objects(cursor, full_hash, data_hash, sentences, payload):
+        """Store the translation; returns the stored (sentences, payload), which another run may have written first."""
+        blob = encode_payload(payload)
         cursor.execute(
-            "INSERT INTO translation_cache (full_hash, data_hash, bilingual_objects) VALUES (?, ?, ?)",
-            (full_hash, data_hash, bo_json)
+            "INSERT INTO translation_cache (full_hash, data_hash, bilingual_objects, bytes, last_access) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(full_hash) DO NOTHING",
+            (full_hash, data_hash, blob, len(blob), time.time())
         )
+        if cursor.rowcount == 0:
+            tracer.log("Translation was cached by a concurrent run, using that one.")
+            cursor.execute("SELECT bilingual_objects FROM translation_cache WHERE full_hash = ?", (full_hash,))
+            sentences, _ = revisions.apply_all(cursor, full_hash, decode_blob(cursor.fetchone()[0]))
+            return sentences, serialize(sentences)
+        tracer.count("cache.bytes_written", len(blob))
+        return sentences, payload
 
     units = select_semantic_units(cur, data_hash)
     if units is not None:
         skip_transcribe = True
-        print("Transcript found in file_cache, skipping transcription.")
+        tracer.log("Transcript found in file_cache, skipping transcription.")
         if ui_callback:
             ui_callback(2, 100)
     else:
         skip_transcribe = False
 
-    try:
-        spacy.load("en_core_web_sm")
-    except OSError:
-        from spacy.cli import download
-        download("en_core_web_sm")
+    # Source audio decoded once to raw PCM, shared by Whisper and the renderer across runs.
+    source_cache = SourceCache(os.path.join(db_config.get("media_dir", MEDIA_CACHE_DIR), "pcm"))
+    # Only mp3/mp4 use the source samples; subtitles need no more than its length.
+    wants_audio = any(media["mp3"] or media["mp4"] for media in map(writer.media_paths, modes))
 
     if not skip_transcribe:
-        model = whisper.load_model("medium")
-        nlp_en = spacy.load("en_core_web_sm")
-        if "sentencizer" not in nlp_en.pipe_names:
-            nlp_en.add_pipe("sentencizer")
-        print("Transcribing audio...")
-        result = model.transcribe(audio_path, language="en", word_timestamps=True, verbose=True)
-
-        def build_semantic_units(transcription):
-            ulist, uid = [], 1
-            for seg in transcription["segments"]:
-                for w in seg["words"]:
-                    raw = w["word"].strip()
-                    if not raw:
-                        continue
-                    for tok in re.findall(r"\d+|[A-Za-z]+|[^\w\s]", raw):
-                        utype = "number" if tok.isdigit() else ("word" if tok.isalpha() else "symbol")
-                        ulist.append({
-                            "id": uid,
-                            "type": utype,
-                            "text": tok,
-                            "audio": {
-                                "origin_start": w["start"],
-                                "origin_end": w["end"]
-                            }
-                        })
-                        uid += 1
-            return ulist
-
-        units = build_semantic_units(result)
-        su_json = json.dumps(units, ensure_ascii=False)
-        insert_semantic_units(cur, data_hash, su_json)
+        checkpoints.set_stage(cur, full_hash, "transcribe")
+        conn.commit()
+        progress = (lambda v: ui_callback(2, v)) if ui_callback else None
+        if text_input:
+            from core.text_ingest import build_text_units, iter_blocks
+            tracer.log("Reading text...")
+            units = build_text_units(iter_blocks(audio_path, progress=progress))
+        else:
+            from core.transcribe import build_semantic_units, transcribe_segments
+            tracer.log("Transcribing audio...")
+            # Decode for the renderer now if it will need it; otherwise only reuse an earlier decode.
+            if wants_audio:
+                with tracer.span("decode.source", cat="transcribe"):
+                    source = source_cache.open(data_hash, audio_path)
+            else:
+                source = source_cache.get(data_hash)
+            units = build_semantic_units(transcribe_segments(audio_path, tmpdir, "medium", progress=progress,
+                                                             source=source))
+        units = insert_semantic_units(cur, data_hash, units)
         conn.commit()
-        print("✅ Transcription saved to file_cache.")
+        tracer.log("✅ Transcription saved to file_cache.")
         if ui_callback:
             ui_callback(2, 100)
 
-    def group_units_by_sentence(units_list):
-        sentences_list = []
-        buffer = []
-        sid = 1
-        for u in units_list:
-            buffer.append(u)
-            if u["type"] == "symbol" and u["text"] in ".?!":
-                text = "".join((t["text"] if t["type"] == "symbol" else " " + t["text"]) for t in buffer).strip()
-                sentences_list.append({
-                    "id": sid,
-                    "text_eng": text,
-                    "units": buffer.copy(),
-                    "start": buffer[0]["audio"]["origin_start"],
-                    "end": buffer[-1]["audio"]["origin_end"]
-                })
-                sid += 1
-                buffer.clear()
-        if buffer:
-            text = " ".join(t["text"] for t in buffer).strip()
-            sentences_list.append({
-                "id": sid,
-                "text_eng": text,
-                "units": buffer.copy(),
-                "start": buffer[0]["audio"]["origin_start"],
-                "end": buffer[-1]["audio"]["origin_end"]
-            })
-        return sentences_list
-
-    sentences = group_units_by_sentence(units)
+    end_stage("transcribe")
 
     bilingual_objects = select_bilingual_objects(cur, full_hash)
     skip_translate = (bilingual_objects is not None)
     if skip_translate:
         sentences = bilingual_objects
-        print("Translation found in translation_cache, skipping translation.")
-
-    gpt_client = None
-    deepl_translator = None
-    lara_translator = None
-    hf_translator = None
-    if translator_choice == "g":
-        gpt_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    elif translator_choice == "d":
-        deepl_translator = deepl.Translator(os.getenv("DEEPL_AUTH_KEY"))
-    elif translator_choice == "l":
-        creds = Credentials(os.getenv("LARA_API_ID"), os.getenv("LARA_API_SECRET"))
-        lara_translator = LaraTranslator(creds)
-    elif translator_choice == "h":
-        hf_translator = hf_pipeline("translation", model="Helsinki-NLP/opus-mt-en-ru")
+        tracer.log("Translation found in translation_cache, skipping translation.")
+    else:
+        from core.segmentation import segment
+        sentences = segment(units)
+        tracer.count("segment.sentences", len(sentences))
+    end_stage("segment")
+
+    # Synthesized Russian audio lives next to the cache so translation_cache hits can replay it.
+    audio_store = AudioStore(os.path.join(db_config.get("media_dir", MEDIA_CACHE_DIR), "tts"))
+
+    # English-only output (mode 0) translates nothing, so it never builds a translator or loads its model.
+    needs_translator = subtitle_mode != "0" and (not skip_translate or edits is not None)
+    translator = get_translator(translator_choice) if needs_translator else None
 
     voice = None
     if translator_choice != "n" and subtitle_mode in ("1", "2", "4"):
         voice = "ru-RU-SvetlanaNeural" if voice_choice.lower().startswith("f") else "ru-RU-DmitryNeural"
 
-    async def _tts_save(text: str, voice: str, path: str) -> bool:
-        try:
-            await edge_tts.Communicate(text, voice).save(path)
-            return os.path.exists(path) and os.path.getsize(path) > 1024
-        except Exception:
-            return False
-
-    def try_generate_tts(text: str, voice: str, path: str, retries: int = 3) -> bool:
-        for i in range(1, retries + 1):
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop_policy(asyncio.DefaultEventLoopPolicy())
-                result = loop.run_until_complete(_tts_save(text, voice, path))
-                loop.close()
-                if result:
-                    return True
-            except Exception as e:
-                print(f"TTS retry {i} failed: {e}")
-            time.sleep(1)
-        return False
-
-    def translate(text: str) -> str:
-        if translator_choice == "g":
-            resp = gpt_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": f"Переведи литературно на русский: {text}"}],
-                temperature=0.3
-            )
-            return resp.choices[0].message.content.strip()
-        elif translator_choice == "d":
-            return deepl_translator.translate_text(text, target_lang="RU").text
-        elif translator_choice == "l":
-            res = lara_translator.translate(text, source="en-US", target="ru-RU")
-            return res.translation
-        elif translator_choice == "h":
-            return hf_translator(text, max_length=512)[0]["translation_text"]
-        elif translator_choice == "n":
-            return ""
-        else:
-            raise RuntimeError("Unsupported translation mode.")
+    tts_engine = get_engine()
+
+    memory = None
+    if translator is not None and translator_choice != "n":
+        memory = TranslationMemory(conn, translator.provider, translator.model)
 
-    def enrich_with_translation(sentences, tmpdir, ui_callback=None):
+    def _export_silence(path):
+        from pydub import AudioSegment
+        AudioSegment.silent(duration=100).export(path, format="mp3")
+        return True
+
+    def is_punctuation_only(s):
+        return re.fullmatch(r"[.?!\s]+", s["text_eng"]) is not None
+
+    def needs_speech(s):
+        return subtitle_mode in ("1", "2", "4") and not is_punctuation_only(s)
+
+    def build_ru_units(s):
+        """Tokenize the Russian text and spread the clip duration evenly over its tokens."""
+        if is_punctuation_only(s):
+            s["units_ru"] = []
+            return
+        from pydub import AudioSegment
+        ru = s["text_ru"]
+        dur = len(AudioSegment.from_file(s["audio_ru_path"])) if needs_speech(s) and s["audio_ru_path"] else 0
+        toks = re.findall(r"\d+|[A-Za-zА-Яа-яЁё]+|[^\w\s]", ru)
+        avg = (dur or 0) / max(len(toks), 1)
+        ru_units, off = UnitBuilder(), 0
+        for uid2, tok in enumerate(toks, start=1):
+            ttype = "number" if tok.isdigit() else ("word" if tok.isalpha() else "symbol")
+            ru_units.add(uid2, ttype, tok, off / 1000, (off + avg) / 1000)
+            off += avg
+        s["units_ru"] = ru_units.build()
+
+    def synthesize_batch(batch, progress=None):
+        """Fill audio_ru_path for `batch`, reusing stored clips and synthesizing the rest concurrently."""
+        pending = {}
+        for s in batch:
+            if is_punctuation_only(s):
+                s["audio_ru_path"] = audio_store.fetch_or_create("", "", _export_silence, {"silence_ms": 100})
+                continue
+            if not needs_speech(s):
+                s["audio_ru_path"] = None
+                continue
+            path = audio_store.get(voice, s["text_ru"])
+            if path:
+                s["audio_ru_path"] = path
+            else:
+                pending.setdefault(s["text_ru"], []).append(s)
+
+        staged = [(text, *audio_store.staging_path(voice, text)) for text in pending]
+        tracer.count("tts.requests", len(staged))
+        with tracer.span("tts.batch", cat="api", clips=len(staged)):
+            results = tts_engine.synthesize_batch([(text, voice, tmp) for text, tmp, _ in staged], progress)
+        for (text, tmp, path), ok in zip(staged, results):
+            stored = audio_store.commit(tmp, path, ok)
+            if stored:
+                tracer.count("tts.bytes", os.path.getsize(stored))
+            for s in pending[text]:
+                s["audio_ru_path"] = stored
+
+    def enrich_with_translation(sentences, ui_callback=None, reuse=None):
         if ui_callback:
             ui_callback(3, 0)
-        for i, s in enumerate(tqdm(sentences, desc="Translating & synthesizing"), start=1):
-            if subtitle_mode == "0":
+        if subtitle_mode == "0":
+            for s in sentences:
                 s["text_ru"] = ""
                 s["audio_ru_path"] = None
                 s["units_ru"] = []
-                continue
-
-            if re.fullmatch(r"[.?!\s]+", s["text_eng"]):
-                s["text_ru"] = s["text_eng"]
-                path = os.path.join(tmpdir, f"ru_{s['id']}.mp3")
-                AudioSegment.silent(duration=100).export(path, format="mp3")
-                s["audio_ru_path"], s["units_ru"] = path, []
-                continue
-
-            ru = translate(s["text_eng"])
-            s["text_ru"] = ru
-            path = os.path.join(tmpdir, f"ru_{s['id']}.mp3")
-
-            if subtitle_mode in ("1", "2", "4"):
-                if try_generate_tts(ru, voice, path):
-                    dur = len(AudioSegment.from_file(path))
-                    s["audio_ru_path"] = path
-                else:
-                    s["audio_ru_path"] = None
-                    dur = 0
+            writer.extend(sentences)
+            if ui_callback:
+                ui_callback(3, 100)
+            return
+
+        # Sentences completed by an interrupted earlier run, or unchanged in `reuse`
+        # ({id: sentence} of a cached version), are taken over as they are.
+        resumed = dict(reuse or {})
+        resumed.update(checkpoints.load_sentences(cur, full_hash))
+        pending, reused = [], []
+        for i, s in enumerate(sentences):
+            saved = resumed.get(s["id"])
+            if (saved is not None and saved["text_eng"] == s["text_eng"]
+                    and (not saved.get("audio_ru_path") or os.path.exists(saved["audio_ru_path"]))):
+                if (saved["start"], saved["end"]) != (s["start"], s["end"]):
+                    # Only the timing was edited: the translation and its clip still apply.
+                    saved = dict(saved, units=s["units"], start=s["start"], end=s["end"])
+                sentences[i] = saved
+                reused.append(saved)
             else:
+                pending.append(s)
+        if reused:
+            writer.extend(reused)
+            tracer.log(f"Reusing {len(sentences) - len(pending)} of {len(sentences)} sentences already done.")
+            tracer.count("checkpoint.resumed_sentences", len(sentences) - len(pending))
+        if memory is not None:
+            memory.prefetch(s["text_eng"] for s in pending)
+
+        def translate_batch(batch):
+            to_translate = [(s["id"], s["text_eng"]) for s in batch if not is_punctuation_only(s)]
+            with tracer.span("translate.batch", cat="translate", sentences=len(batch)):
+                translations = translate_sentences(translator, to_translate, memory, tracer=tracer)
+            for s in batch:
+                s["text_ru"] = s["text_eng"] if is_punctuation_only(s) else translations[s["id"]]
+
+        in_flight = {}
+
+        def start_synthesis(s):
+            if is_punctuation_only(s):
+                s["audio_ru_path"] = audio_store.fetch_or_create("", "", _export_silence, {"silence_ms": 100})
+                return None
+            if not needs_speech(s):
                 s["audio_ru_path"] = None
-                dur = 0
-
-            toks = re.findall(r"\d+|[A-Za-zА-Яа-яЁё]+|[^\w\s]", ru)
-            avg = (dur or 0) / max(len(toks), 1)
-            ru_units, off = [], 0
-            for uid2, tok in enumerate(toks, start=1):
-                ttype = "number" if tok.isdigit() else ("word" if tok.isalpha() else "symbol")
-                ru_units.append({
-                    "id": uid2,
-                    "type": ttype,
-                    "text": tok,
-                    "audio": {
-                        "origin_start": off / 1000,
-                        "origin_end": (off + avg) / 1000
-                    }
-                })
-                off += avg
-            s["units_ru"] = ru_units
+                return None
+            path = audio_store.get(voice, s["text_ru"])
+            if path:
+                s["audio_ru_path"] = path
+                return None
+            # Identical lines already queued share one request.
+            if s["text_ru"] not in in_flight:
+                tmp, final = audio_store.staging_path(voice, s["text_ru"])
+                future = tts_engine.submit(s["text_ru"], voice, tmp)
+                tracer.count("tts.requests")
+                start, chars = tracer.now(), len(s["text_ru"])
+                future.add_done_callback(
+                    lambda f, start=start, chars=chars: tracer.add_span("tts.request", start, tracer.now(),
+                                                                        cat="api", chars=chars))
+                in_flight[s["text_ru"]] = {"future": future, "tmp": tmp, "path": final, "committed": False}
+            return in_flight[s["text_ru"]]
+
+        def finish(s, job):
+            with tracer.span("sentence", cat="sentence", id=s["id"]):
+                if job is not None:
+                    if not job["committed"]:
+                        job["path"] = audio_store.commit(job["tmp"], job["path"], job["future"].result())
+                        job["committed"] = True
+                        if job["path"]:
+                            tracer.count("tts.bytes", os.path.getsize(job["path"]))
+                    s["audio_ru_path"] = job["path"]
+                build_ru_units(s)
+
+        resumed_count = len(sentences) - len(pending)
+        last_commit = time.time()
+
+        def on_done(s, done, total):
+            nonlocal last_commit
+            checkpoints.save_sentence(cur, full_hash, s)
+            writer.append(s)
+            if time.time() - last_commit >= CHECKPOINT_INTERVAL:
+                if memory is not None:
+                    memory.flush()
+                conn.commit()
+                last_commit = time.time()
             if ui_callback:
-                ui_callback(3, int(i / len(sentences) * 100))
+                ui_callback(3, int((resumed_count + done) / len(sentences) * 100))
+
+        try:
+            run_translation_stages(pending, translate_batch, start_synthesis, finish,
+                                   batch_size=translator.max_batch_items, on_done=on_done)
+        finally:
+            # Keep whatever finished, so the next run resumes after the last completed sentence.
+            if memory is not None:
+                memory.flush()
+            conn.commit()
         if ui_callback:
             ui_callback(3, 100)
 
-    if not skip_translate:
-        enrich_with_translation(sentences, tmpdir, ui_callback)
-        bo_json = json.dumps(sentences, ensure_ascii=False)
-        insert_bilingual_objects(cur, full_hash, data_hash, bo_json)
+    def replay_translation(sentences, ui_callback=None):
+        """Reuse cached text and audio; only clips missing from disk are synthesized again.
+
+        Returns the serialized sentences.
+        """
+        missing = []
+        for s in sentences:
+            path = s.get("audio_ru_path")
+            if path and os.path.exists(path):
+                audio_store.touch(path)
+            elif path:
+                missing.append(s)
+        if missing:
+            tracer.log(f"Re-synthesizing {len(missing)} missing audio clips.")
+
+            def tts_progress(done, total):
+                if ui_callback:
+                    ui_callback(3, int(done / total * 100))
+
+            synthesize_batch(missing, tts_progress)
+            for s in missing:
+                build_ru_units(s)
+        payload = serialize(sentences)
+        if missing:
+            # The new clip paths go into the row itself, with earlier revisions folded in.
+            revisions.compact(cur, full_hash, encode_payload(payload))
+            conn.commit()
+        writer.extend(sentences)
+        if ui_callback:
+            ui_callback(3, 100)
+        return payload
+
+    revision = None
+    writer.open_stream()
+    if edits is not None:
+        checkpoints.set_stage(cur, full_hash, "translate")
+        conn.commit()
+        current = sentences
+        sentences, delta = revisions.edit(current, edits)
+        tracer.log(f"Revising {len(delta['changed'])} changed and {len(delta['removed'])} removed sentences.")
+        tracer.count("revision.changed", len(delta["changed"]))
+        enrich_with_translation(sentences, ui_callback, reuse={s["id"]: s for s in current})
+        # Store the changed sentences as enriched, translation included.
+        changed = {s["id"] for s in delta["changed"]}
+        delta["changed"] = [s for s in sentences if s["id"] in changed]
+        payload = serialize(sentences)
+        if delta["changed"] or delta["removed"]:
+            revision = revisions.save(cur, full_hash, delta)
+            if revision >= revisions.COMPACT_AFTER:
+                revisions.compact(cur, full_hash, encode_payload(payload))
+            tracer.log(f"✅ Revision {revision} saved to translation_revisions.")
+        checkpoints.set_stage(cur, full_hash, "render")
+        conn.commit()
+    elif not skip_translate:
+        checkpoints.set_stage(cur, full_hash, "translate")
         conn.commit()
-        print("✅ Translation and TTS saved to translation_cache.")
+        enrich_with_translation(sentences, ui_callback)
+        # Serialized once: the cache blob and every JSON artifact share these bytes.
+        payload = serialize(sentences)
+        sentences, payload = insert_bilingual_objects(cur, full_hash, data_hash, sentences, payload)
+        checkpoints.set_stage(cur, full_hash, "render")
+        conn.commit()
+        tracer.log("✅ Translation and TTS saved to translation_cache.")
     else:
-        enrich_with_translation(sentences, tmpdir, ui_callback)
-
-    def generate_outputs(sentences, audio_path, tmpdir, suffix, output_dir, subtitle_mode, ui_callback=None):
-        full_audio = AudioSegment.from_file(audio_path)
-        out_audio = AudioSegment.empty()
-        subs = pysubs2.SSAFile()
-        subs.styles["Top"] = pysubs2.SSAStyle(fontname="Arial", fontsize=22, bold=True, alignment=Alignment.TOP_CENTER)
-        subs.styles["Bottom"] = pysubs2.SSAStyle(fontname="Arial", fontsize=22, bold=True, alignment=Alignment.BOTTOM_CENTER)
-
-        base = os.path.splitext(os.path.basename(audio_path))[0]
-        base_path = os.path.join(output_dir, base)
-
-        # JSON outputs
-        with open(f"{base_path}_semantic_units_{suffix}.json", "w", encoding="utf-8") as f:
-            json.dump(sentences, f, ensure_ascii=False, indent=2)
-        with open(f"{base_path}_bilingual_objects_{suffix}.json", "w", encoding="utf-8") as f:
-            json.dump(sentences, f, ensure_ascii=False, indent=2)
+        payload = replay_translation(sentences, ui_callback)
+    if memory is not None:
+        tm = memory.stats()
+        tracer.count("translation_memory.hit", tm["hits"])
+        tracer.count("translation_memory.miss", tm["misses"])
+        tracer.log(f"Translation memory: {tm['hits']} hits, {tm['misses']} misses ({tm['hit_rate']:.0%}).")
+    writer.close_stream()
+    end_stage("translate")
+
+    def render_media(sentences, targets, audio_path, tmpdir, ui_callback=None):
+        """Render every (mode, media paths) target from one decode of the source and the clips."""
+        import pysubs2
+        from pysubs2 import Alignment
+        from pydub import AudioSegment
+        from core.render import render_outputs
+        from core.timeline import build_timeline, segment_to_array
 
         if ui_callback:
             ui_callback(4, 0)
 
-        for idx, s in enumerate(tqdm(sentences, desc="Building A/V"), start=1):
-            st = int(s["start"] * 1000)
-            et = int(s["end"] * 1000)
-            eng = full_audio[st:et].fade_in(1).fade_out(1)
-            dur_e = len(eng)
-            pos_en = len(out_audio)
-            out_audio += eng
-
-            if subtitle_mode in ("0", "1"):
-                subs.append(pysubs2.SSAEvent(start=pos_en, end=pos_en + dur_e, text=s["text_eng"], style="Top"))
-
-            if subtitle_mode in ("1", "2", "3", "4"):
-                out_audio += AudioSegment.silent(duration=10)
-
-                if subtitle_mode == "1":
-                    pos_ru = len(out_audio)
-                    if s["audio_ru_path"]:
-                        ru_audio = AudioSegment.from_file(s["audio_ru_path"]).fade_in(3)
-                        out_audio += ru_audio
-                        dur_r = len(ru_audio)
-                    else:
-                        dur_r = 0
-                    subs.append(pysubs2.SSAEvent(start=pos_ru, end=pos_ru + dur_r, text=s["text_ru"], style="Top"))
-
-                elif subtitle_mode == "4":
-                    if s["audio_ru_path"]:
-                        ru_audio = AudioSegment.from_file(s["audio_ru_path"]).fade_in(3)
-                    else:
-                        ru_audio = AudioSegment.silent(0)
-                    pos_ru = len(out_audio)
-                    out_audio += ru_audio
-                    end_ru = len(out_audio)
-                    subs.append(pysubs2.SSAEvent(start=pos_en, end=end_ru, text=s["text_ru"], style="Top"))
-
-                elif subtitle_mode == "2":
-                    out_audio += AudioSegment.silent(duration=10)
-                    pos_ru = len(out_audio)
-                    if s["audio_ru_path"]:
-                        ru_audio = AudioSegment.from_file(s["audio_ru_path"]).fade_in(3)
-                        out_audio += ru_audio
-                        dur_r = len(ru_audio)
-                    else:
-                        dur_r = 0
-                    end_all = pos_ru + dur_r
-                    subs.append(pysubs2.SSAEvent(start=pos_en, end=end_all, text=s["text_eng"], style="Top"))
-                    subs.append(pysubs2.SSAEvent(start=pos_en, end=end_all, text=s["text_ru"], style="Bottom"))
-
-                elif subtitle_mode == "3":
-                    subs.append(pysubs2.SSAEvent(start=pos_en, end=pos_en + dur_e, text=s["text_ru"], style="Top"))
-
-            if idx < len(sentences):
-                gap = int((sentences[idx]["start"] - s["end"]) * 1000)
-                out_audio += AudioSegment.silent(duration=max(gap // 3, 10))
+        if text_input:
+            # Text has no source audio: the English parts are silence of reading length.
+            from core.text_ingest import TEXT_CHANNELS, TEXT_FRAME_RATE, silent_source
+            frame_rate, channels = TEXT_FRAME_RATE, TEXT_CHANNELS
+            source = silent_source(sentences[-1]["end"] if sentences else 0, frame_rate, channels)
+        elif wants_audio or source_cache.get(data_hash) is not None:
+            # Sentence slices of the memory-mapped decode are views; only the rendered output is copied.
+            with tracer.span("decode.source", cat="render"):
+                src = source_cache.open(data_hash, audio_path)
+            frame_rate, channels, source = src.frame_rate, src.channels, src.samples
+        else:
+            # Subtitles only: silence of the source's length stands in for its samples.
+            from core.text_ingest import silent_source
+            frame_rate, channels, seconds = probe(audio_path)
+            source = silent_source(seconds, frame_rate, channels)
+        decoded_clips = {}
+
+        def load_ru_clip(path):
+            # Identical Russian lines share one stored clip; decode each of them once for all targets.
+            if path not in decoded_clips:
+                audio_store.touch(path)
+                clip = AudioSegment.from_file(path).fade_in(3)
+                decoded_clips[path] = (segment_to_array(clip, channels), len(clip), clip.frame_rate)
+            return decoded_clips[path]
+
+        for n, (mode, media) in enumerate(targets, start=1):
+            subs = pysubs2.SSAFile()
+            subs.styles["Top"] = pysubs2.SSAStyle(fontname="Arial", fontsize=22, bold=True,
+                                                  alignment=Alignment.TOP_CENTER)
+            subs.styles["Bottom"] = pysubs2.SSAStyle(fontname="Arial", fontsize=22, bold=True,
+                                                     alignment=Alignment.BOTTOM_CENTER)
+
+            timeline, events = build_timeline(sentences, source, frame_rate, channels, mode, load_ru_clip)
+            for start, end, text, style in events:
+                subs.append(pysubs2.SSAEvent(start=start, end=end, text=text, style=style))
+            if media["srt"]:
+                subs.save(media["srt"])
+                writer.record(media["srt"])
+
+            if media["mp3"] or media["mp4"]:
+                with tracer.span("timeline.render", cat="render", mode=mode, events=len(events)):
+                    samples = timeline.render()
+                ass_path = os.path.join(tmpdir, f"subs_{mode}.ass")
+                if media["mp4"]:
+                    subs.save(ass_path)
+                tracer.log(f"Exporting MP3 and video (ffmpeg, subtitle mode {mode})…")
+                with tracer.span("ffmpeg", cat="render", mode=mode, frames=len(samples)):
+                    render_outputs(samples, timeline.frame_rate, media["mp3"], media["mp4"], ass_path)
+                writer.record(media["mp3"])
+                writer.record(media["mp4"])
+                del samples
 
             if ui_callback:
-                ui_callback(4, int(idx / len(sentences) * 100))
-
-        # === Final exports ===
-        mp3_out = f"{base_path}_bilingual_{suffix}.mp3"
-        srt_out = f"{base_path}_bilingual_{suffix}.srt"
-        mp4_out = f"{base_path}_bilingual_{suffix}.mp4"
-        txt_out = f"{base_path}_bilingual_{suffix}.txt"
-        ass_path = os.path.join(tmpdir, "subs.ass")
-
-        subs.save(ass_path)
-        subs.save(srt_out)
-        print("Exporting MP3…")
-        out_audio.export(mp3_out, format="mp3")
-
-        black = os.path.join(tmpdir, "black.jpg")
-        Image.new("RGB", (1280, 720), color="black").save(black)
-        safe_ass = ass_path.replace('\\', '\\\\').replace(':', '\\:')
-        cmd = [
-            "ffmpeg", "-y", "-loop", "1", "-framerate", "2",
-            "-i", black, "-i", mp3_out,
-            "-vf", f"ass='{safe_ass}'",
-            "-c:v", "libx264", "-tune", "stillimage", "-shortest",
-            "-c:a", "aac", "-b:a", "192k", "-map", "0:v", "-map", "1:a",
-            mp4_out
-        ]
-        print("Generating video (ffmpeg)…")
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-        # Save text output
-        with open(txt_out, "w", encoding="utf-8") as f:
-            json.dump(sentences, f, ensure_ascii=False, indent=2)
-
-        print("✅ Done:\n •", mp3_out, "\n •", mp4_out, "\n •", srt_out, "\n •", txt_out)
+                ui_callback(4, int(n / len(targets) * 100))
+
+    def generate_outputs(sentences, payload, audio_path, tmpdir, ui_callback=None):
+        writer.write_json(payload)
+        # A single mode keeps the untagged file names.
+        targets = [(mode, writer.media_paths(mode if len(modes) > 1 else None)) for mode in modes]
+        if any(any(media.values()) for _, media in targets):
+            render_media(sentences, targets, audio_path, tmpdir, ui_callback)
+        elif ui_callback:
+            # Only JSON artifacts requested: no decoding, timeline or ffmpeg.
+            ui_callback(4, 100)
+
+        outputs = writer.written
+        tracer.count("output.bytes", sum(os.path.getsize(p) for p in outputs if os.path.exists(p)))
+        tracer.log("✅ Done:\n • " + "\n • ".join(outputs))
 
         if ui_callback:
-            ui_callback(4, 100)
             ui_callback(5, 100)
-        
-        return True
+
+        return outputs
 
     try:
-        generate_outputs(sentences, audio_path, tmpdir, suffix, output_dir, subtitle_mode, ui_callback)
+        outputs = generate_outputs(sentences, payload, audio_path, tmpdir, ui_callback)
+        end_stage("render")
+        checkpoints.finish_job(cur, full_hash)
+        conn.commit()
+        evicted = audio_store.trim()
+        st = audio_store.stats()
+        tracer.count("tts_store.hit", st["hits"])
+        tracer.count("tts_store.miss", st["misses"])
+        tracer.log(f"TTS audio store: {st['hits']} hits, {st['misses']} misses, {evicted} clips evicted.")
+        evicted = source_cache.trim(keep=source_cache.paths(data_hash))
+        pcm = source_cache.stats()
+        tracer.count("source_pcm.hit", pcm["hits"])
+        tracer.count("source_pcm.miss", pcm["misses"])
+        if pcm["hits"] or pcm["misses"] or evicted:
+            tracer.log(f"Source PCM cache: {pcm['hits']} hits, {pcm['misses']} misses, {evicted} files evicted.")
+        pruned = cache_admin.prune(conn)
+        if any(e["rows"] for e in pruned.values()):
+            tracer.log("cache.db evicted: "
+                       + ", ".join(f"{t} {e['rows']} rows" for t, e in pruned.items() if e["rows"]))
+            cache_admin.vacuum_in_background(pool)
     finally:
+        writer.close_stream()
         shutil.rmtree(tmpdir, ignore_errors=True)
         cur.close()
-        conn.close()
-
-    print(f"Execution time: {time.time() - start_time:.2f} sec.")
+        if ui_callback:
+            ui_callback.flush()
+
+    total = time.time() - start_time
+    tracer.log(f"Execution time: {total:.2f} sec.")
+    return {
+        "audio_path": audio_path,
+        "full_hash": full_hash,
+        "subtitle_modes": list(modes),
+        "seconds": round(total, 3),
+        "stages": tracer.span_seconds(),
+        "counters": dict(tracer.counters),
+        "cache": {
+            "fingerprint": from_index,
+            "transcript": skip_transcribe,
+            "translation": skip_translate,
+            "revision": revision,
+            "translation_memory": memory.stats() if memory is not None else None,
+            "tts_store": st,
+            "source_pcm": pcm,
+        },
+        "outputs": outputs,
+    }
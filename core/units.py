@@ -0,0 +1,227 @@
+# ========== core/units.py ==========
+"""
+Array-backed container for semantic units.
+A UnitArray keeps one NumPy array per field (id, type code, start, end and an
+offset into an interned string table) instead of one dict per token. Indexing
+returns a read-only dict-compatible view, slicing returns a UnitArray sharing
+the same arrays, and to_json()/from_json() convert losslessly to and from the
+list-of-dicts schema used in the JSON outputs (cache_engine.json_default calls
+to_json(), so sentences holding a UnitArray serialize unchanged):
+
+    {"id": 1, "type": "word", "text": "Hello",
+     "audio": {"origin_start": 0.0, "origin_end": 0.42}}
+"""
+
+import re
+import base64
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+
+UNIT_TYPES = ("word", "number", "symbol")
+COLUMNS_FORMAT = "units-columns/1"
+TOKEN_RE = re.compile(r"\d+|[A-Za-z]+|[^\w\s]")
+
+_DTYPES = {"ids": "<i8", "types": "<u1", "text": "<i4", "start": "<f8", "end": "<f8"}
+
+
+class UnitView(Mapping):
+    """Read-only dict view of one unit, for code that expects the JSON schema."""
+
+    __slots__ = ("_units", "_i")
+    _KEYS = ("id", "type", "text", "audio")
+
+    def __init__(self, units, i):
+        self._units = units
+        self._i = i
+
+    def __getitem__(self, key):
+        u, i = self._units, self._i
+        if key == "id":
+            return int(u.ids[i])
+        if key == "type":
+            return u.type_names[u.types[i]]
+        if key == "text":
+            return u.strings[u.text[i]]
+        if key == "audio":
+            return {"origin_start": float(u.start[i]), "origin_end": float(u.end[i])}
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class UnitBuilder:
+    """Collects units row by row and interns their strings.
+
+    Columns grow in typed arrays, a few bytes per unit, so long inputs can be
+    built without a Python object per field.
+    """
+
+    def __init__(self):
+        self.ids, self.types, self.text = array("q"), array("B"), array("i")
+        self.start, self.end = array("d"), array("d")
+        self.strings, self._string_ids = [], {}
+        self.type_names, self._type_ids = list(UNIT_TYPES), {t: i for i, t in enumerate(UNIT_TYPES)}
+
+    def _intern(self, table, index, value):
+        i = index.get(value)
+        if i is None:
+            i = index[value] = len(table)
+            table.append(value)
+        return i
+
+    def add(self, uid, utype, text, start, end):
+        self.ids.append(uid)
+        self.types.append(self._intern(self.type_names, self._type_ids, utype))
+        self.text.append(self._intern(self.strings, self._string_ids, text))
+        self.start.append(start)
+        self.end.append(end)
+
+    def build(self):
+        return UnitArray(
+            np.array(self.ids, dtype=_DTYPES["ids"]),
+            np.array(self.types, dtype=_DTYPES["types"]),
+            np.array(self.text, dtype=_DTYPES["text"]),
+            np.array(self.start, dtype=_DTYPES["start"]),
+            np.array(self.end, dtype=_DTYPES["end"]),
+            self.strings, self.type_names,
+        )
+
+
+class UnitArray:
+    def __init__(self, ids, types, text, start, end, strings, type_names=UNIT_TYPES):
+        self.ids, self.types, self.text, self.start, self.end = ids, types, text, start, end
+        self.strings = strings
+        self.type_names = tuple(type_names)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return UnitArray(self.ids[key], self.types[key], self.text[key], self.start[key], self.end[key],
+                             self.strings, self.type_names)
+        n = len(self.ids)
+        if key < 0:
+            key += n
+        if not 0 <= key < n:
+            raise IndexError("unit index out of range")
+        return UnitView(self, key)
+
+    def __iter__(self):
+        return (UnitView(self, i) for i in range(len(self.ids)))
+
+    def __eq__(self, other):
+        if isinstance(other, (UnitArray, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def texts(self):
+        return [self.strings[i] for i in self.text.tolist()]
+
+    def type_of(self, name):
+        """Boolean mask of units with type `name`."""
+        if name not in self.type_names:
+            return np.zeros(len(self), dtype=bool)
+        return self.types == self.type_names.index(name)
+
+    def text_in(self, values):
+        """Boolean mask of units whose text is one of `values`."""
+        wanted = [i for i, s in enumerate(self.strings) if s in values]
+        return np.isin(self.text, wanted)
+
+    def to_json(self):
+        """The list-of-dicts schema of the JSON outputs."""
+        names, strings = self.type_names, self.strings
+        return [
+            {"id": uid, "type": names[t], "text": strings[s], "audio": {"origin_start": a, "origin_end": b}}
+            for uid, t, s, a, b in zip(self.ids.tolist(), self.types.tolist(), self.text.tolist(),
+                                       self.start.tolist(), self.end.tolist())
+        ]
+
+    @classmethod
+    def from_json(cls, units):
+        builder = UnitBuilder()
+        for u in units:
+            builder.add(u["id"], u["type"], u["text"], u["audio"]["origin_start"], u["audio"]["origin_end"])
+        return builder.build()
+
+    def to_columns(self):
+        """Compact JSON-safe form for the cache: raw little-endian columns plus the string table."""
+        # Slices may reference only part of the string table; store just what they use.
+        used, text = np.unique(self.text, return_inverse=True)
+        columns = {"ids": self.ids, "types": self.types, "text": text, "start": self.start, "end": self.end}
+        return {
+            "format": COLUMNS_FORMAT,
+            "strings": [self.strings[i] for i in used.tolist()],
+            "type_names": list(self.type_names),
+            **{name: base64.b64encode(np.ascontiguousarray(col, dtype=_DTYPES[name]).tobytes()).decode("ascii")
+               for name, col in columns.items()},
+        }
+
+    @classmethod
+    def from_columns(cls, data):
+        cols = {name: np.frombuffer(base64.b64decode(data[name]), dtype=dtype) for name, dtype in _DTYPES.items()}
+        return cls(cols["ids"], cols["types"], cols["text"], cols["start"], cols["end"],
+                   data["strings"], data["type_names"])
+
+
+def is_columns(data):
+    return isinstance(data, dict) and data.get("format") == COLUMNS_FORMAT
+
+
+def load_units(data):
+    """UnitArray from either the cached column form or the list-of-dicts schema."""
+    if isinstance(data, UnitArray):
+        return data
+    return UnitArray.from_columns(data) if is_columns(data) else UnitArray.from_json(data)
+
+
+def tokenize(text):
+    """(type, token) pairs of `text`: digit runs, letter runs and single symbols."""
+    for tok in TOKEN_RE.findall(text):
+        yield ("number" if tok.isdigit() else ("word" if tok.isalpha() else "symbol")), tok
+
+
+def join_tokens(texts, is_symbol):
+    """Sentence text from unit texts: words spaced, symbols attached to what precedes them."""
+    return "".join(t if sym else " " + t for t, sym in zip(texts, is_symbol)).strip()
+
+
+def make_sentence(units, sid, a, b, text):
+    """Sentence dict over units[a:b]; its units are a slice of `units`."""
+    return {
+        "id": sid,
+        "text_eng": text,
+        "units": units[a:b],
+        "start": float(units.start[a]),
+        "end": float(units.end[b - 1])
+    }
+
+
+def group_by_sentence(units):
+    """Split at sentence-final symbols; every sentence's units are a slice of `units`."""
+    texts = units.texts()
+    is_symbol = units.type_of("symbol")
+    ends = (np.flatnonzero(is_symbol & units.text_in((".", "?", "!"))) + 1).tolist()
+    if len(units) and (not ends or ends[-1] != len(units)):
+        ends.append(len(units))
+    is_symbol = is_symbol.tolist()
+    sentences, a = [], 0
+    for sid, b in enumerate(ends, start=1):
+        if is_symbol[b - 1] and texts[b - 1] in (".", "?", "!"):
+            text = join_tokens(texts[a:b], is_symbol[a:b])
+        else:
+            # Trailing words without final punctuation.
+            text = " ".join(texts[a:b]).strip()
+        sentences.append(make_sentence(units, sid, a, b, text))
+        a = b
+    return sentences
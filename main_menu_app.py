@@ -436,7 +436,7 @@ class NewFile(Screen):
         self.ids.project_label.text = DB.cur_proj["name"] if DB.cur_proj else ""
 
     def choose_file(self):
-        fc = FileChooserIconView(filters=["*.mp3","*.wav","*.txt","*.pdf"])
+        fc = FileChooserIconView(filters=["*.mp3","*.wav","*.txt","*.pdf","*.epub"])
         mv = ModalView(size_hint=(0.9, 0.9))
         fc.bind(on_submit=lambda inst, sel, *_: (setattr(self, 'selected_path', os.path.basename(sel[0])) if sel else None, mv.dismiss()))
         mv.add_widget(fc); mv.open()
@@ -16,7 +16,6 @@ from kivy.uix.anchorlayout import AnchorLayout
 from kivy.uix.scrollview import ScrollView
 from kivy.graphics import Color, Line
 
-from core.pipeline import process_file
 from core.db_utils import init_settings_db, init_cache_db, get_setting, set_setting
 from ui.workspace import WorkspaceWidget
 
@@ -131,7 +130,7 @@ class MainLayout(BoxLayout):
         last_dir = get_setting('last_dir', os.getcwd())
         if not os.path.isdir(last_dir):
             last_dir = os.getcwd()
-        chooser = FileChooserIconView(path=last_dir, filters=["*.mp3", "*.wav", "*.txt", "*.pdf"])
+        chooser = FileChooserIconView(path=last_dir, filters=["*.mp3", "*.wav", "*.txt", "*.pdf", "*.epub"])
         popup = ModalView(size_hint=(0.9, 0.9))
         popup.add_widget(chooser)
 
@@ -172,6 +171,8 @@ class MainLayout(BoxLayout):
         # Run the processing pipeline in a separate thread
         def run_processing():
             try:
+                # Imported here so the window opens without loading the processing backends.
+                from core.pipeline import process_file
                 process_file(
                     audio_path=self.selected_file,
                     output_dir=os.path.dirname(self.selected_file),